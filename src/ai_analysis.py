@@ -1,18 +1,16 @@
-from langchain_ollama import OllamaLLM
-from langchain_core.prompts import ChatPromptTemplate
+import functools
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Iterator
+import etl
 
-def analyze_sentiment(news_list: list, model_name: str = "llama3.1") -> tuple[int, str]:
-    """
-    Analyzes the sentiment of the latest 5 news headlines using a local LLM.
-    Returns a score (1-10) and a 1-sentence summary.
-    """
-    if not news_list:
-        return 5, "No news found to analyze."
-        
-    headlines = [n.get('title', '') for n in news_list[:5]]
-    context = "\n".join([f"- {h}" for h in headlines])
-    
-    prompt_template = ChatPromptTemplate.from_template("""
+logger = etl.logger
+
+PROMPT_TEMPLATE = """
         You are a financial analyst. Analyze the sentiment of the following news headlines for a stock:
         
         {context}
@@ -22,28 +20,342 @@ def analyze_sentiment(news_list: list, model_name: str = "llama3.1") -> tuple[in
         Summary: [One sentence summary]
         
         Score 1 is extremely negative, 10 is extremely positive.
-    """)
+    """
+
+SENTIMENT_CACHE_TTL = 24 * 60 * 60 # Seconds a cached analysis stays valid
+SENTIMENT_CACHE_MAX_ENTRIES = 1000 # Least recently used entries beyond this are evicted
+
+DEFAULT_MODEL = "llama3.1"
+DEFAULT_MAX_IN_FLIGHT = 4 # Concurrent requests against the Ollama endpoint in batch runs
+DEFAULT_TIMEOUT = 120 # Seconds per LLM request
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 1.0 # Seconds, doubled after every failed attempt
+
+def _cache_key(model_name: str, headlines: list[str]) -> str:
+    payload = json.dumps([model_name, PROMPT_TEMPLATE, sorted(headlines)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _count(conn, name: str):
+    conn.execute("""
+        INSERT INTO sentiment_cache_stats (name, value) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET value = value + 1
+    """, (name,))
+
+def _cache_get(key: str) -> tuple[int, str] | None:
+    now = time.time()
+    with etl.transaction() as conn:
+        row = conn.execute(
+            "SELECT score, summary FROM sentiment_cache WHERE cache_key = ? AND created_at >= ?",
+            (key, now - SENTIMENT_CACHE_TTL)
+        ).fetchone()
+        if row is None:
+            _count(conn, "misses")
+            return None
+        conn.execute(
+            "UPDATE sentiment_cache SET hits = hits + 1, last_used_at = ? WHERE cache_key = ?",
+            (now, key)
+        )
+        _count(conn, "hits")
+    return row[0], row[1]
+
+def _cache_put(key: str, model_name: str, score: int, summary: str):
+    now = time.time()
+    with etl.transaction() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO sentiment_cache (cache_key, model, score, summary, created_at, last_used_at, hits)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+        """, (key, model_name, score, summary, now, now))
+        # Evict expired entries, then the least recently used beyond the size limit
+        conn.execute("DELETE FROM sentiment_cache WHERE created_at < ?", (now - SENTIMENT_CACHE_TTL,))
+        conn.execute("""
+            DELETE FROM sentiment_cache WHERE cache_key IN (
+                SELECT cache_key FROM sentiment_cache
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        """, (SENTIMENT_CACHE_MAX_ENTRIES,))
+
+def cache_stats() -> dict:
+    """
+    Returns persistent sentiment cache counters: hits, misses, hit_rate and entries.
+    """
+    conn = etl.get_connection()
+    stats = dict(conn.execute("SELECT name, value FROM sentiment_cache_stats").fetchall())
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    entries = conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
     
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": entries
+    }
+
+def _parse_score(line: str) -> int | None:
     try:
-        model = OllamaLLM(model=model_name) 
-        chain = prompt_template | model
-        response = chain.invoke({"context": context})
+        score_str = line.split("Score:")[1].strip()
+        return int(float(score_str.split('/')[0]))
+    except Exception:
+        return None
+
+def _parse_response(response: str) -> tuple[int, str, bool]:
+    """
+    Like parse_response, plus whether a score was actually found. Fallback
+    results must not be cached, or one bad generation sticks for the whole TTL.
+    """
+    lines = response.split('\n')
+    score = None
+    summary = "Could not parse analysis."
+    
+    for line in lines:
+        if "Score:" in line:
+            parsed = _parse_score(line)
+            if parsed is not None:
+                score = parsed
+        if "Summary:" in line:
+            summary = line.split("Summary:")[1].strip()
+    
+    return (score if score is not None else 5), summary, score is not None
+
+def parse_response(response: str) -> tuple[int, str]:
+    """
+    Extracts the score and summary from the model's "Score:"/"Summary:" output.
+    """
+    return _parse_response(response)[:2]
+
+class SentimentStreamParser:
+    """
+    Incrementally parses streamed model output. The score becomes available as
+    soon as the "Score:" line is complete, long before the summary has finished.
+    """
+    def __init__(self):
+        self.text = ""
+        self.score = None
+        self._parsed_upto = 0
+    
+    def feed(self, token: str) -> bool:
+        """
+        Adds a token. Returns True if this token completed the score line.
+        """
+        self.text += token
+        if self.score is not None:
+            return False
         
-        lines = response.split('\n')
-        score = 5
-        summary = "Could not parse analysis."
+        complete = self.text.rfind('\n')
+        if complete < self._parsed_upto:
+            return False
         
-        for line in lines:
+        for line in self.text[self._parsed_upto:complete].split('\n'):
             if "Score:" in line:
-                try:
-                    score_str = line.split("Score:")[1].strip()
-                    score = int(float(score_str.split('/')[0]))
-                except Exception:
-                    pass
-            if "Summary:" in line:
-                summary = line.split("Summary:")[1].strip()
-                
+                self.score = _parse_score(line)
+                if self.score is not None:
+                    break
+        self._parsed_upto = complete + 1
+        
+        return self.score is not None
+    
+    def result(self) -> tuple[int, str]:
+        """
+        Final (score, summary) once the stream has ended.
+        """
+        score, summary = parse_response(self.text)
+        return (self.score if self.score is not None else score), summary
+    
+    @property
+    def parsed(self) -> bool:
+        """
+        Whether the output contained a score, i.e. result() is not a fallback.
+        """
+        return self.score is not None or _parse_response(self.text)[2]
+
+@functools.lru_cache(maxsize=16)
+def _get_chain(model_name: str, base_url: str | None = None, timeout: float | None = None):
+    """
+    Builds the prompt | model chain once per configuration. Creating the HTTP
+    client is expensive, and the client is safe to share between threads.
+    """
+    # LangChain takes about a second to import, so load it only when a model is needed
+    from langchain_ollama import OllamaLLM
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    options = {}
+    if base_url:
+        options["base_url"] = base_url
+    if timeout:
+        options["client_kwargs"] = {"timeout": timeout}
+    model = OllamaLLM(model=model_name, **options)
+    
+    return ChatPromptTemplate.from_template(PROMPT_TEMPLATE) | model
+
+def _run_model(headlines: list[str], model_name: str, base_url: str | None = None, timeout: float | None = None) -> tuple[int, str, bool]:
+    """
+    Runs the sentiment prompt against Ollama and returns (score, summary, parsed).
+    Raises on connection errors and timeouts.
+    """
+    context = "\n".join([f"- {h}" for h in headlines])
+    chain = _get_chain(model_name, base_url, timeout)
+    
+    return _parse_response(chain.invoke({"context": context}))
+
+def analyze_sentiment(news_list: list, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> tuple[int, str]:
+    """
+    Analyzes the sentiment of the latest 5 news headlines using a local LLM.
+    Returns a score (1-10) and a 1-sentence summary.
+    Results are cached per model, prompt and headline set (see SENTIMENT_CACHE_TTL).
+    """
+    if not news_list:
+        return 5, "No news found to analyze."
+        
+    headlines = [n.get('title', '') for n in news_list[:5]]
+    
+    key = _cache_key(model_name, headlines)
+    if use_cache:
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+    
+    try:
+        score, summary, parsed = _run_model(headlines, model_name)
+        
+        if use_cache and parsed:
+            _cache_put(key, model_name, score, summary)
+        
         return score, summary
         
     except Exception as e:
         return 5, f"AI Analysis failed (Ensure Ollama is running): {str(e)}"
+
+def stream_sentiment(news_list: list, parser: SentimentStreamParser, model_name: str = DEFAULT_MODEL,
+                     use_cache: bool = True) -> Iterator[str]:
+    """
+    Streaming variant of analyze_sentiment: yields the model output token by
+    token as it arrives and feeds it into parser, so callers can render text
+    progressively and show parser.score as soon as it is known.
+    Call parser.result() afterwards for the final (score, summary).
+    """
+    if not news_list:
+        message = "Summary: No news found to analyze."
+        parser.feed(message)
+        yield message
+        return
+    
+    headlines = [n.get('title', '') for n in news_list[:5]]
+    key = _cache_key(model_name, headlines)
+    
+    if use_cache:
+        cached = _cache_get(key)
+        if cached is not None:
+            text = f"Score: {cached[0]}\nSummary: {cached[1]}"
+            parser.feed(text)
+            yield text
+            return
+    
+    context = "\n".join([f"- {h}" for h in headlines])
+    try:
+        for token in _get_chain(model_name).stream({"context": context}):
+            parser.feed(token)
+            yield token
+    except Exception as e:
+        message = f"\nSummary: AI Analysis failed (Ensure Ollama is running): {str(e)}"
+        parser.feed(message)
+        yield message
+        return
+    
+    if use_cache and parser.parsed:
+        _cache_put(key, model_name, *parser.result())
+
+def _ticker_headlines(result: dict, news_fn: Callable[[str], list]) -> list[str]:
+    """
+    Latest 5 headlines for result["ticker"]; news failures are reported in result["error"].
+    """
+    try:
+        headlines = [n.get('title', '') for n in (news_fn(result["ticker"]) or [])[:5]]
+    except Exception as e:
+        result["error"] = f"News extraction failed: {e}"
+        headlines = []
+    result["headlines"] = len(headlines)
+    if not headlines and result["error"] is None:
+        result["error"] = "No news found"
+    return headlines
+
+def _score_ticker(result: dict, headlines: list[str], base_url: str | None, timeout: float, retries: int) -> dict:
+    """
+    Runs the model for one ticker with retries and exponential backoff. Never raises;
+    failures are reported in the "error" field. Does not touch the database.
+    """
+    start = time.perf_counter()
+    while result["score"] is None and result["attempts"] <= retries:
+        if result["attempts"]:
+            time.sleep(RETRY_BACKOFF * 2 ** (result["attempts"] - 1))
+        result["attempts"] += 1
+        try:
+            result["score"], result["summary"], result["parsed"] = _run_model(headlines, result["model"], base_url, timeout)
+            result["error"] = None
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    
+    result["duration"] += time.perf_counter() - start
+    return result
+
+def _guarded(cache_fn, *args):
+    """
+    Runs a sentiment cache lookup or write, treating database errors (e.g. a
+    locked database) as a cache miss instead of failing the batch.
+    """
+    try:
+        return cache_fn(*args)
+    except sqlite3.Error as e:
+        logger.warning(f"Sentiment cache unavailable: {e}")
+        return None
+
+def _store_sentiment(result: dict, scored_at: str):
+    with etl.transaction() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO stock_sentiment
+            (ticker, scored_at, model, score, summary, headlines, attempts, duration, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (result["ticker"], scored_at, result["model"], result["score"], result["summary"],
+              result["headlines"], result["attempts"], result["duration"], result["error"]))
+
+def score_universe(tickers: list[str], model_name: str = DEFAULT_MODEL, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                   timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES, base_url: str | None = None,
+                   news_fn: Callable[[str], list] | None = None) -> list[dict]:
+    """
+    Scores many tickers concurrently with at most max_in_flight requests against
+    the Ollama endpoint at a time, and stores every result in stock_sentiment.
+    Returns one result dict per ticker (score, summary, attempts, duration, error,
+    and parsed for model runs: False when the output held no score and the
+    default was used, which is then not cached).
+    """
+    news_fn = news_fn or etl.refresh_news
+    scored_at = datetime.now().isoformat(timespec="seconds") # Naive local time, like etl_runs and stock_news
+    results = []
+    
+    # News and the sentiment cache live in SQLite, so they are read and written on this
+    # thread only; workers just wait on the model and SQLite only sees one writer
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        futures = {}
+        for ticker in tickers:
+            start = time.perf_counter()
+            result = {"ticker": ticker, "model": model_name, "score": None, "summary": None,
+                      "headlines": 0, "attempts": 0, "error": None}
+            headlines = _ticker_headlines(result, news_fn)
+            cached = _guarded(_cache_get, _cache_key(model_name, headlines)) if headlines else None
+            result["duration"] = time.perf_counter() - start
+            
+            if headlines and cached is None:
+                futures[pool.submit(_score_ticker, result, headlines, base_url, timeout, retries)] = headlines
+                continue
+            if cached is not None:
+                result["score"], result["summary"] = cached
+            _store_sentiment(result, scored_at)
+            results.append(result)
+        
+        for future in as_completed(futures):
+            result = future.result()
+            if result.get("parsed"):
+                _guarded(_cache_put, _cache_key(model_name, futures[future]), model_name, result["score"], result["summary"])
+            _store_sentiment(result, scored_at)
+            results.append(result)
+    
+    return results
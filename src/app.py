@@ -1,12 +1,18 @@
+import os
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import etl
 import metrics
-import ai_analysis
+import dcf
+import scheduler
+import perf
 
 # --- Configuration ---
 DEFAULT_TICKER = "UBSG.SW"
+DEBUG_PERF = os.environ.get("DEBUG_PERF", "0") == "1" # Default of the sidebar's performance panel toggle
+DCF_DEFAULTS = {"dcf_discount_rate": 8.0, "dcf_terminal_growth": 2.0, "dcf_years": dcf.DEFAULT_YEARS} # Reverse DCF slider keys
 
 # --- Dashboard Visualization ---
 
@@ -66,19 +72,48 @@ def main():
     # Sidebar
     st.sidebar.header("CONFIGURATION")
     ticker = st.sidebar.text_input("Ticker Symbol", value=DEFAULT_TICKER).upper()
+    debug = st.sidebar.toggle("DEBUG PERFORMANCE", value=DEBUG_PERF)
     
+    profiler = perf.RenderProfiler(enabled=debug)
+    with profiler.run():
+        with profiler.section("sidebar"):
+            render_sidebar(ticker)
+        render_dashboard(ticker, profiler)
+    
+    if debug:
+        render_perf_panel(profiler)
+
+def render_sidebar(ticker: str):
     if st.sidebar.button("REFRESH DATA"):
-        with st.spinner(f"Requesting data for {ticker}..."):
-            # ETL: Extract
-            etl.load_data(ticker)
-            st.sidebar.success(f"loaded: {ticker}")
+        # ETL: Extract (queued for the background scheduler, see scheduler.py)
+        for kind in scheduler.JOB_STAGES:
+            scheduler.enqueue(ticker, kind)
+        st.sidebar.success(f"queued: {ticker}")
     
+    for job in scheduler.job_status(ticker):
+        if job["status"] in ("pending", "running"):
+            st.sidebar.caption(f"{job['kind']}: {job['status']} (attempt {job['attempts'] + 1})")
+        elif job["status"] == "failed":
+            st.sidebar.caption(f"{job['kind']}: failed ({job['last_error']})")
+        else:
+            finished = pd.Timestamp(job["finished_at"], unit="s", tz="UTC").tz_convert(None)
+            st.sidebar.caption(f"{job['kind']}: refreshed {finished:%Y-%m-%d %H:%M} UTC in {job['duration']:.1f}s")
+
+def render_perf_panel(profiler: perf.RenderProfiler):
+    totals = profiler.totals()
+    with st.sidebar.expander("PERFORMANCE", expanded=True):
+        st.caption(f"Rerun: {totals['ms']:.0f} ms, {totals['queries']} queries, {totals['rows']:,} rows")
+        st.dataframe(profiler.summary(), width="stretch")
+        st.dataframe(profiler.transform_summary(), width="stretch")
+
+def render_dashboard(ticker: str, profiler: perf.RenderProfiler):
     st.subheader(ticker)
     # ETL: Transform (Fetch from DB for display)
-    df = etl.transform_history(ticker, days=-1)
+    with profiler.section("history"):
+        df = etl.transform_history(ticker, days=-1)
     
     if df.empty:
-        st.info("No data available. Use Sidebar to fetch data.")
+        st.info("No data available. Use REFRESH DATA to queue a fetch (processed by scheduler.py).")
         return
 
     # Top KPI Bar
@@ -93,51 +128,80 @@ def main():
     col3.metric("LOW", f"{latest['low']:.2f}")
     col4.metric("VOLUME", f"{latest['volume']:,}" if 'volume' in df.columns else "N/A") # Capitalized Latest was a typo in thought logic, fixing in code
     
-    # Tabbed Layout
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["MARKET DATA", "FINANCIAL STATEMENTS", "METRICS", "REVERSE DCF", "INTELLIGENCE"])
+    # Tabbed Layout: only the selected tab (and sub-tab) is computed on a rerun, so switching
+    # tickers costs the history query plus whatever is on screen
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["MARKET DATA", "FINANCIAL STATEMENTS", "METRICS", "REVERSE DCF", "INTELLIGENCE"],
+                                           key="main_tab", on_change="rerun")
+    
+    # Widgets that are not rendered lose their state; keeping it in Session State
+    # preserves the DCF assumptions while another tab is open
+    for key, value in DCF_DEFAULTS.items():
+        st.session_state[key] = st.session_state.get(key, value)
+    
+    if tab1.open:
+        with tab1, profiler.section("MARKET DATA"):
+            render_market_data(ticker, df, profiler)
+    if tab2.open:
+        with tab2, profiler.section("FINANCIAL STATEMENTS"):
+            render_statements(ticker, profiler)
+    if tab3.open:
+        with tab3, profiler.section("METRICS"):
+            render_metrics(ticker, profiler)
+    if tab4.open:
+        with tab4, profiler.section("REVERSE DCF"):
+            render_dcf(ticker, profiler)
+    if tab5.open:
+        with tab5, profiler.section("INTELLIGENCE"):
+            render_intelligence(ticker)
+
+def render_market_data(ticker: str, df: pd.DataFrame, profiler: perf.RenderProfiler):
+    st.markdown("### PRICE ACTION")
+    # Adaptive resolution (daily -> weekly -> monthly with age) keeps the figure small
+    with profiler.section("chart data"):
+        chart_df = etl.transform_chart_history(ticker)
     
-    with tab1:
-        st.markdown("### PRICE ACTION")
-        # Helper to generate smart buttons with dynamic Y-axis and Active Styling
-        last_date = df.index.max()
-        buttons_config = [
-            ("1m", pd.DateOffset(months=1)),
-            ("3m", pd.DateOffset(months=3)),
-            ("ytd", None),
-            ("1y", pd.DateOffset(years=1)),
-            ("5y", pd.DateOffset(years=5)),
-            ("max", None)
-        ]
+    # Helper to generate smart buttons with dynamic Y-axis and Active Styling
+    last_date = chart_df.index.max()
+    buttons_config = [
+        ("1m", pd.DateOffset(months=1)),
+        ("3m", pd.DateOffset(months=3)),
+        ("ytd", None),
+        ("1y", pd.DateOffset(years=1)),
+        ("5y", pd.DateOffset(years=5)),
+        ("max", None)
+    ]
 
+    with profiler.section("range masks"):
         # 1. Pre-calculate all ranges
         range_data = [] 
-        
+    
         for label, offset in buttons_config:
             if label == "max":
-                start = df.index.min()
+                start = chart_df.index.min()
             elif label == "ytd":
                 start = pd.Timestamp(f"{last_date.year}-01-01")
             else:
                 start = last_date - offset
-            
-            if start < df.index.min():
-                start = df.index.min()
+        
+            if start < chart_df.index.min():
+                start = chart_df.index.min()
 
-            mask = (df.index >= start) & (df.index <= last_date)
-            local_df = df.loc[mask]
-            
+            mask = (chart_df.index >= start) & (chart_df.index <= last_date)
+            local_df = chart_df.loc[mask]
+        
             y_max = 100
             y_min = 0
             if not local_df.empty:
                 y_max = local_df['high'].max()
                 y_min = local_df['low'].min()
-            
+        
             range_data.append({
                 "label": label,
                 "xaxis": [start, last_date],
                 "yaxis": [y_min * 0.9, y_max * 1.1]
             })
 
+    with profiler.section("candlestick build"):
         # 2. Helper for styling labels
         def get_styled_label(text, active=False):
             if active:
@@ -150,12 +214,12 @@ def main():
             # When THIS button (i) is clicked:
             # - We apply its x/y ranges
             # - We update ALL button labels so only button (i) looks active
-            
+        
             layout_update = {
                 "xaxis.range": current_btn_data["xaxis"],
                 "yaxis.range": current_btn_data["yaxis"],
             }
-            
+        
             for j, btn_j in enumerate(range_data):
                 is_active = (i == j)
                 layout_update[f'updatemenus[0].buttons[{j}].label'] = get_styled_label(btn_j["label"], active=is_active)
@@ -167,20 +231,20 @@ def main():
             ))
 
         fig = go.Figure(data=[go.Candlestick(
-            x=df.index,
-            open=df['open'],
-            high=df['high'],
-            low=df['low'],
-            close=df['close']
+            x=chart_df.index,
+            open=chart_df['open'],
+            high=chart_df['high'],
+            low=chart_df['low'],
+            close=chart_df['close']
         )])
 
         # Set default view to 1 Year (or max if < 1y)
         default_start = last_date - pd.DateOffset(years=1)
-        if default_start < df.index.min():
-            default_start = df.index.min()
-            
-        default_mask = (df.index >= default_start) & (df.index <= last_date)
-        default_df = df.loc[default_mask]
+        if default_start < chart_df.index.min():
+            default_start = chart_df.index.min()
+        
+        default_mask = (chart_df.index >= default_start) & (chart_df.index <= last_date)
+        default_df = chart_df.loc[default_mask]
         y_max_def = default_df['high'].max() if not default_df.empty else 100
         y_min_def = default_df['low'].min() if not default_df.empty else 0
 
@@ -211,89 +275,91 @@ def main():
                 )
             ]
         )
+    with profiler.section("chart render"):
         st.plotly_chart(fig, width="stretch")
-        
-        with st.expander("RAW DATA"):
-            st.dataframe(df.sort_values(by='date', ascending=False), width="stretch")
+    
+    with st.expander("RAW DATA"):
+        st.dataframe(df.sort_values(by='date', ascending=False), width="stretch")
 
-    with tab2:
-        st.markdown("### FINANCIAL STATEMENTS")
+def render_statements(ticker: str, profiler: perf.RenderProfiler):
+    st.markdown("### FINANCIAL STATEMENTS")
+    
+    # --- Helper for Financial Sorting ---
+    def filter_and_sort(df, order_list):
+        if df.empty:
+            return pd.DataFrame()
+        # Create a localized copy to avoid settingWithCopy warnings on the original df
+        df = df.copy()
+        # Ensure index is string to match the list
+        df.index = df.index.astype(str)
         
-        # --- Helper for Financial Sorting ---
-        def filter_and_sort(df, order_list):
-            if df.empty:
-                return pd.DataFrame()
-            # Create a localized copy to avoid settingWithCopy warnings on the original df
-            df = df.copy()
-            # Ensure index is string to match the list
-            df.index = df.index.astype(str)
-            
-            # Select only rows that exist in the dataframe
-            existing_keys = [k for k in order_list if k in df.index]
-            
-            # Reindex creates the new sorted dataframe
-            sorted_df = df.reindex(existing_keys)
-            
-            # Drop rows that are completely empty (optional, but good for cleanliness)
-            sorted_df = sorted_df.dropna(how='all')
-            
-            return sorted_df
-
-        # --- Hardcoded Order Lists (Based on Library Docs.pdf) ---
-        ASSETS_ORDER = [
-            "CurrentAssets", "CashAndCashEquivalents", "OtherShortTermInvestments", 
-            "AccountsReceivable", "Inventory", 
-            "TotalNonCurrentAssets", "GrossPPE", "AccumulatedDepreciation", "NetPPE", 
-            "Goodwill", "OtherIntangibleAssets", 
-            "TotalAssets"
-        ]
+        # Select only rows that exist in the dataframe
+        existing_keys = [k for k in order_list if k in df.index]
         
-        LIAB_EQUITY_ORDER = [
-            "CurrentLiabilities", "AccountsPayable", "CurrentAccruedExpenses", 
-            "TotalTaxPayable", "CurrentDebtAndCapitalLeaseObligation", 
-            "TotalNonCurrentLiabilitiesNetMinorityInterest", "LongTermDebt", 
-            "NonCurrentDeferredTaxesLiabilities", "TotalLiabilitiesNetMinorityInterest",
-            "StockholdersEquity", "CommonStock", "CapitalStock", "PreferredStock", 
-            "RetainedEarnings", "TreasurySharesNumber", 
-            "GainsLossesNotAffectingRetainedEarnings"
-        ]
+        # Reindex creates the new sorted dataframe
+        sorted_df = df.reindex(existing_keys)
         
-        INCOME_STMT_ORDER = [
-            "TotalRevenue", "OperatingRevenue", 
-            "CostOfRevenue", "ReconciledCostOfRevenue", 
-            "GrossProfit", 
-            "OperatingIncome", "EBIT", 
-            "OperatingExpense", "ResearchAndDevelopment", 
-            "SellingGeneralAndAdministration", 
-            "EBITDA", "NormalizedEBITDA", 
-            "NetInterestIncome", "InterestExpense", 
-            "TotalUnusualItems", "WriteOff", 
-            "PretaxIncome", "TaxProvision", 
-            "NetIncome", "NetIncomeCommonStockholders", 
-            "BasicEPS", "DilutedEPS"
-        ]
+        # Drop rows that are completely empty (optional, but good for cleanliness)
+        sorted_df = sorted_df.dropna(how='all')
         
-        CASH_FLOW_ORDER = [
-            "OperatingCashFlow", 
-            "NetIncomeFromContinuingOperations", 
-            "DepreciationAndAmortization", "Depreciation", 
-            "StockBasedCompensation", 
-            "DeferredIncomeTax", 
-            "ChangesInAccountReceivables", "ChangeInAccountPayable", 
-            "InvestingCashFlow", 
-            "CapitalExpenditure", "PurchaseOfPPE", 
-            "NetBusinessPurchaseAndSale", "NetInvestmentPurchaseAndSale", 
-            "FinancingCashFlow", 
-            "NetIssuancePaymentsOfDebt", 
-            "LongTermDebtIssuance", "LongTermDebtPayments", 
-            "CommonStockDividendPaid", "RepurchaseOfCapitalStock", 
-            "EffectOfExchangeRateChanges", 
-            "ChangesInCash", "BeginningCashPosition", "EndCashPosition"
-        ]
+        return sorted_df
 
-        fund_tabs = st.tabs(["Balance Sheet", "Income Statement", "Cash Flow"])
-        
-        with fund_tabs[0]:
+    # --- Hardcoded Order Lists (Based on Library Docs.pdf) ---
+    ASSETS_ORDER = [
+        "CurrentAssets", "CashAndCashEquivalents", "OtherShortTermInvestments", 
+        "AccountsReceivable", "Inventory", 
+        "TotalNonCurrentAssets", "GrossPPE", "AccumulatedDepreciation", "NetPPE", 
+        "Goodwill", "OtherIntangibleAssets", 
+        "TotalAssets"
+    ]
+    
+    LIAB_EQUITY_ORDER = [
+        "CurrentLiabilities", "AccountsPayable", "CurrentAccruedExpenses", 
+        "TotalTaxPayable", "CurrentDebtAndCapitalLeaseObligation", 
+        "TotalNonCurrentLiabilitiesNetMinorityInterest", "LongTermDebt", 
+        "NonCurrentDeferredTaxesLiabilities", "TotalLiabilitiesNetMinorityInterest",
+        "StockholdersEquity", "CommonStock", "CapitalStock", "PreferredStock", 
+        "RetainedEarnings", "TreasurySharesNumber", 
+        "GainsLossesNotAffectingRetainedEarnings"
+    ]
+    
+    INCOME_STMT_ORDER = [
+        "TotalRevenue", "OperatingRevenue", 
+        "CostOfRevenue", "ReconciledCostOfRevenue", 
+        "GrossProfit", 
+        "OperatingIncome", "EBIT", 
+        "OperatingExpense", "ResearchAndDevelopment", 
+        "SellingGeneralAndAdministration", 
+        "EBITDA", "NormalizedEBITDA", 
+        "NetInterestIncome", "InterestExpense", 
+        "TotalUnusualItems", "WriteOff", 
+        "PretaxIncome", "TaxProvision", 
+        "NetIncome", "NetIncomeCommonStockholders", 
+        "BasicEPS", "DilutedEPS"
+    ]
+    
+    CASH_FLOW_ORDER = [
+        "OperatingCashFlow", 
+        "NetIncomeFromContinuingOperations", 
+        "DepreciationAndAmortization", "Depreciation", 
+        "StockBasedCompensation", 
+        "DeferredIncomeTax", 
+        "ChangesInAccountReceivables", "ChangeInAccountPayable", 
+        "InvestingCashFlow", 
+        "CapitalExpenditure", "PurchaseOfPPE", 
+        "NetBusinessPurchaseAndSale", "NetInvestmentPurchaseAndSale", 
+        "FinancingCashFlow", 
+        "NetIssuancePaymentsOfDebt", 
+        "LongTermDebtIssuance", "LongTermDebtPayments", 
+        "CommonStockDividendPaid", "RepurchaseOfCapitalStock", 
+        "EffectOfExchangeRateChanges", 
+        "ChangesInCash", "BeginningCashPosition", "EndCashPosition"
+    ]
+
+    fund_tabs = st.tabs(["Balance Sheet", "Income Statement", "Cash Flow"], key="statement_tab", on_change="rerun")
+    
+    if fund_tabs[0].open:
+        with fund_tabs[0], profiler.section("balance sheet"):
             bs_df = etl.transform_financial_statement(ticker, "balance_sheet")
             if not bs_df.empty:
                 col1, col2 = st.columns(2)
@@ -308,7 +374,8 @@ def main():
             else:
                 st.info("No Balance Sheet data available.")
                 
-        with fund_tabs[1]:
+    if fund_tabs[1].open:
+        with fund_tabs[1], profiler.section("income statement"):
             st.subheader("Income Statement")
             inc_df = etl.transform_financial_statement(ticker, "income_stmt")
             if not inc_df.empty:
@@ -317,7 +384,8 @@ def main():
             else:
                 st.info("No Income Statement data available.")
                 
-        with fund_tabs[2]:
+    if fund_tabs[2].open:
+        with fund_tabs[2], profiler.section("cash flow"):
             st.subheader("Cash Flow")
             cf_df = etl.transform_financial_statement(ticker, "cashflow_stmt")
             if not cf_df.empty:
@@ -326,46 +394,47 @@ def main():
             else:
                 st.info("No Cash Flow data available.")
 
-    with tab3:
-        st.markdown("### FINANCIAL PERFORMANCE METRICS")
-        
-        # Load statements for metric calculation
-        inc_df = etl.transform_financial_statement(ticker, "income_stmt")
-        bs_df = etl.transform_financial_statement(ticker, "balance_sheet")
+def render_metrics(ticker: str, profiler: perf.RenderProfiler):
+    st.markdown("### FINANCIAL PERFORMANCE METRICS")
+    
+    inc_df = etl.transform_financial_statement(ticker, "income_stmt")
+    
+    if not inc_df.empty:
+        # Metrics are precomputed by the ETL pipeline (backfilled by scheduler.py for older databases)
+        m_tabs = st.tabs(["Margins & Ratios", "Growth Analysis", "Peers"], key="metrics_tab", on_change="rerun")
         
-        if not inc_df.empty:
-            m_tabs = st.tabs(["Margins & Ratios", "Growth Analysis", "Peers"])
-            
-            with m_tabs[0]:
+        if m_tabs[0].open:
+            with m_tabs[0], profiler.section("margins & ratios"):
                 st.subheader("Valuation Metrics")
-                pe_series = metrics.calculate_pe(ticker)
-                pb_series = metrics.calculate_pb(ticker)
-                val_df = pd.DataFrame({"P/E Ratio": pe_series, "P/B Ratio": pb_series}).transpose()
-                val_df.columns = val_df.columns.strftime("%Y-%m-%d")
+                val_df = etl.transform_metrics(ticker, "valuation")
                 if not val_df.empty:
+                    val_df.columns = val_df.columns.strftime("%Y-%m-%d")
                     st.dataframe(val_df, width="stretch")
                 
                 st.subheader("Profitability Margins")
-                margins = metrics.calculate_margins(inc_df)
-                margins.columns = pd.to_datetime(margins.columns).strftime("%Y")
+                margins = etl.transform_metrics(ticker, "margins")
                 if not margins.empty:
+                    margins.columns = margins.columns.strftime("%Y")
                     st.dataframe(margins, width="stretch")
                 
                 st.subheader("Efficiency Ratios")
-                ratios = metrics.calculate_efficiency_ratios(bs_df, inc_df)
-                ratios.columns = pd.to_datetime(ratios.columns).strftime("%Y")
+                ratios = etl.transform_metrics(ticker, "efficiency")
                 if not ratios.empty:
+                    ratios.columns = ratios.columns.strftime("%Y")
                     st.dataframe(ratios, width="stretch")
             
-            with m_tabs[1]:
+        if m_tabs[1].open:
+            with m_tabs[1], profiler.section("growth"):
                 st.subheader("Year-over-Year Growth")
-                growth = metrics.calculate_growth_yoy(inc_df)
+                growth = etl.transform_metrics(ticker, "growth")
                 if not growth.empty:
+                    growth.columns = [f"{date:%Y-%m-%d} (YoY)" for date in growth.columns]
                     st.dataframe(growth, width="stretch")
                 else:
                     st.info("Insufficient historical data for growth calculation.")
 
-            with m_tabs[2]:
+        if m_tabs[2].open:
+            with m_tabs[2], profiler.section("peers"):
                 st.subheader("Peer Comparison")
                 peers = etl.transform_peers(ticker)
                 if not peers:
@@ -373,18 +442,11 @@ def main():
                 else:
                     # Compare ticker and its peers
                     comparison_tickers = [ticker] + peers
-                    pe_data = {}
-                    pb_data = {}
 
                     with st.spinner(f"Computing metrics for {len(comparison_tickers)} peers..."):
-                        for t in comparison_tickers:
-                            pe_series = metrics.calculate_pe(t)
-                            if not pe_series.empty:
-                                pe_data[t] = pe_series.iloc[0] # Latest value
-                            
-                            pb_series = metrics.calculate_pb(t)
-                            if not pb_series.empty:
-                                pb_data[t] = pb_series.iloc[0] # Latest value
+                        valuation = metrics.calculate_peer_valuation(comparison_tickers)
+                    pe_data = valuation["P/E Ratio"].dropna().to_dict()
+                    pb_data = valuation["P/B Ratio"].dropna().to_dict()
                     
                     if pe_data:
                         fig_pe = go.Figure(data=[go.Bar(
@@ -415,40 +477,82 @@ def main():
                             height=400
                         )
                         st.plotly_chart(fig_pb, width="stretch")
-        else:
-            st.info("No income statement data available for metric calculation.")
-
-    with tab4:
-        st.markdown("### REVERSE DCF ANALYSIS")
-        st.info("Module coming soon...")
+    else:
+        st.info("No income statement data available for metric calculation.")
 
-    with tab5:
-        st.markdown("### MARKET INTELLIGENCE")
+def render_dcf(ticker: str, profiler: perf.RenderProfiler):
+    st.markdown("### REVERSE DCF ANALYSIS")
+    
+    c1, c2, c3 = st.columns(3)
+    discount_rate = c1.slider("Discount Rate (%)", 4.0, 15.0, step=0.5, key="dcf_discount_rate") / 100
+    terminal_growth = c2.slider("Terminal Growth (%)", 0.0, 4.0, step=0.25, key="dcf_terminal_growth") / 100
+    years = c3.slider("Forecast Years", 5, 20, key="dcf_years")
+    
+    # Grid centered on the selected assumptions; solved for the whole peer set in one pass
+    discount_rates = discount_rate + np.arange(-2, 3) * 0.01
+    terminal_growths = terminal_growth + np.arange(-2, 3) * 0.005
+    with profiler.section("inputs"):
+        dcf_tickers = [ticker] + etl.transform_peers(ticker)
+        dcf_inputs = dcf.load_dcf_inputs(dcf_tickers)
+    with profiler.section("implied growth grid"):
+        implied = dcf.implied_growth_grid(dcf_inputs, discount_rates, terminal_growths, years)
+    
+    if np.isnan(implied[0]).all():
+        st.info("Insufficient price, cash flow or share data for a reverse DCF.")
+    else:
+        st.subheader("Market-Implied FCF Growth (%)")
+        st.dataframe(dcf.sensitivity_table(implied[0], discount_rates, terminal_growths), width="stretch")
         
-        if st.button("RUN AI SENTIMENT ANALYSIS"):
-            with st.spinner("Analyzing neural streams..."):
-                # Re-fetch news just for analysis
-                _, news = etl.extract_data(ticker)
+        st.subheader("Inputs")
+        st.dataframe(dcf_inputs.loc[[ticker]], width="stretch")
+    
+    if len(dcf_tickers) > 1:
+        st.subheader("Peer Comparison")
+        peer_dcf = dcf_inputs.copy()
+        peer_dcf["Implied Growth (%)"] = implied[:, 2, 2] * 100
+        st.dataframe(peer_dcf, width="stretch")
+
+def render_intelligence(ticker: str):
+    st.markdown("### MARKET INTELLIGENCE")
+    
+    if st.button("RUN AI SENTIMENT ANALYSIS"):
+        with st.spinner("Analyzing neural streams..."):
+            # Stored headlines; only hits the network if they are stale
+            news = etl.refresh_news(ticker)
+            
+        # Handling case where no news is returned to avoid errors
+        if not news:
+            st.error("No news found for analysis.")
+        else:
+            st.markdown("---")
+            c1, c2 = st.columns([1, 4])
+            score_slot = c1.empty()
+            text_slot = c2.empty()
+            
+            import ai_analysis # Deferred: pulls in LangChain, which most sessions never need
+            
+            # Render tokens as they arrive; show the score as soon as its line is complete
+            parser = ai_analysis.SentimentStreamParser()
+            for _ in ai_analysis.stream_sentiment(news, parser):
+                text_slot.markdown(f"```\n{parser.text}\n```")
+                if parser.score is not None:
+                    score_slot.metric("SENTIMENT SCORE", f"{parser.score}/10", delta=parser.score-5)
+            
+            score, summary = parser.result()
+            score_slot.metric("SENTIMENT SCORE", f"{score}/10", delta=score-5)
+            with c2:
+                text_slot.markdown(f"**ANALYSIS:** {summary}")
                 
-                # Handling case where no news is returned to avoid errors
-                if not news:
-                    st.error("No news found for analysis.")
+                if score > 7:
+                    st.success("SIGNAL: BULLISH")
+                elif score < 4:
+                    st.error("SIGNAL: BEARISH")
                 else:
-                    score, summary = ai_analysis.analyze_sentiment(news)
-                    
-                    st.markdown("---")
-                    c1, c2 = st.columns([1, 4])
-                    with c1:
-                        st.metric("SENTIMENT SCORE", f"{score}/10", delta=score-5)
-                    with c2:
-                        st.markdown(f"**ANALYSIS:** {summary}")
-                        
-                        if score > 7:
-                            st.success("SIGNAL: BULLISH")
-                        elif score < 4:
-                            st.error("SIGNAL: BEARISH")
-                        else:
-                            st.warning("SIGNAL: NEUTRAL")
+                    st.warning("SIGNAL: NEUTRAL")
+            
+            cache = ai_analysis.cache_stats()
+            st.caption(f"Sentiment cache: {cache['hit_rate']:.0%} hit rate ({cache['hits']} hits / {cache['misses']} misses)")
+
 
 if __name__ == "__main__":
     main()
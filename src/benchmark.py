@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import etl
+import metrics
+import price_store
+import providers
+
+PEER_GROUP_SIZE = 5
+
+def synthetic_universe(n_tickers: int) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Returns N synthetic tickers and a peer map linking each to the next
+    PEER_GROUP_SIZE tickers (wrapping around).
+    """
+    tickers = [f"SYN{i:04d}" for i in range(n_tickers)]
+    peers = {
+        ticker: [tickers[(i + k) % n_tickers] for k in range(1, min(PEER_GROUP_SIZE, n_tickers - 1) + 1)]
+        for i, ticker in enumerate(tickers)
+    }
+    return tickers, peers
+
+def build_database(tickers: list[str], peers: dict[str, list[str]], years: int) -> dict[str, list[float]]:
+    """
+    Fills etl.DB_NAME with deterministic synthetic bars and statements from a
+    FixtureProvider, timing every loader call. Returns the load timings.
+    """
+    provider = providers.FixtureProvider(path=None, years=years, statement_years=min(years, 4))
+    timings = {"load_history": [], "load_statements": []}
+
+    for ticker in tickers:
+        history = provider.history(ticker).reset_index()
+        statements = (provider.balance_sheet(ticker), provider.income_stmt(ticker), provider.cashflow(ticker))
+
+        with etl.transaction():
+            start = time.perf_counter()
+            etl.load_history(ticker, history)
+            timings["load_history"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            etl.load_balance_sheets(ticker, statements[0])
+            etl.load_income_stmt(ticker, statements[1])
+            etl.load_cashflow_stmt(ticker, statements[2])
+            timings["load_statements"].append(time.perf_counter() - start)
+
+            etl.load_peer_links(ticker, peers[ticker])
+
+    return timings
+
+def measure(fn, tickers: list[str], repeat: int, cold: bool) -> list[float]:
+    """
+    Times fn(ticker) for every ticker, `repeat` times. With cold=True the
+    transform cache is cleared before every call, otherwise it is warmed up first.
+    """
+    if not cold:
+        for ticker in tickers:
+            fn(ticker)
+    
+    timings = []
+    for _ in range(repeat):
+        for ticker in tickers:
+            if cold:
+                etl.clear_cache()
+            start = time.perf_counter()
+            fn(ticker)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+def hot_paths(peers: dict[str, list[str]]) -> dict:
+    return {
+        "transform_history": lambda t: etl.transform_history(t, days=-1),
+        "transform_history_90d": lambda t: etl.transform_history(t, days=90),
+        "transform_financial_statement": lambda t: etl.transform_financial_statement(t, "income_stmt"),
+        "calculate_pe": metrics.calculate_pe,
+        "calculate_pb": metrics.calculate_pb,
+        "calculate_margins": lambda t: metrics.calculate_margins(etl.transform_financial_statement(t, "income_stmt")),
+        "peer_valuation": lambda t: metrics.calculate_peer_valuation([t] + peers[t]),
+    }
+
+def summarize(timings: list[float]) -> dict:
+    values = np.array(timings) * 1000
+    return {
+        "runs": len(values),
+        "min_ms": round(float(values.min()), 3),
+        "median_ms": round(float(np.median(values)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "total_ms": round(float(values.sum()), 3),
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(n_tickers: int, years: int, repeat: int, sample: int) -> dict:
+    """
+    Builds a synthetic universe in etl.DB_NAME and times the loaders and the
+    dashboard hot paths, cold (empty transform cache) and warm.
+    """
+    tickers, peers = synthetic_universe(n_tickers)
+    sampled = tickers[:sample]
+
+    start = time.perf_counter()
+    load_timings = build_database(tickers, peers, years)
+    build_seconds = time.perf_counter() - start
+    rows = etl.get_connection().execute("SELECT COUNT(*) FROM stock_history").fetchone()[0] if etl.PRICE_BACKEND == "sqlite" else None
+
+    results = {name: summarize(timings) for name, timings in load_timings.items()}
+    for name, fn in hot_paths(peers).items():
+        results[f"{name} (cold)"] = summarize(measure(fn, sampled, repeat, cold=True))
+        results[f"{name} (warm)"] = summarize(measure(fn, sampled, repeat, cold=False))
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "price_backend": etl.PRICE_BACKEND,
+        },
+        "parameters": {"tickers": n_tickers, "years": years, "repeat": repeat, "sample": len(sampled)},
+        "build_seconds": round(build_seconds, 3),
+        "history_rows": rows,
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Prints median timings against a baseline run and returns the benchmarks
+    that got slower by more than `threshold` (e.g. 0.2 = 20%).
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None or not before["median_ms"]:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        flag = " !" if change > threshold else ""
+        print(f"{name:<40} {before['median_ms']:>9.2f}ms {result['median_ms']:>8.2f}ms {change:>+7.0%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the ETL loaders and dashboard hot paths on a synthetic universe.")
+    parser.add_argument("--tickers", type=int, default=50, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars per ticker")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions of every hot-path measurement")
+    parser.add_argument("--sample", type=int, default=20, help="Tickers to time the hot paths on")
+    parser.add_argument("--db", default=None, help="Keep the synthetic database at this path (default: temporary)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown reported as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = args.db or os.path.join(tmp, "financial_data.db")
+        if not args.db:
+            price_store.PARQUET_DIR = os.path.join(tmp, "prices")
+        report = run_benchmarks(args.tickers, args.years, args.repeat, args.sample)
+        etl.close_connections()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Built {args.tickers} tickers x {args.years} years in {report['build_seconds']:.1f}s")
+    for name, result in report["results"].items():
+        print(f"{name:<40} median {result['median_ms']:>9.2f}ms   p95 {result['p95_ms']:>9.2f}ms")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions: {', '.join(regressions)}")
+            raise SystemExit(1)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import etl
+
+DEFAULT_YEARS = 10
+GROWTH_BRACKET = (-0.5, 1.0) # Implied growth outside this range is reported as NaN
+BISECTION_STEPS = 60
+
+def dcf_value(fcf, growth, discount_rate, terminal_growth, years: int = DEFAULT_YEARS) -> np.ndarray:
+    """
+    Present value of free cash flows growing at `growth` for `years`, plus a
+    Gordon terminal value growing at `terminal_growth` afterwards.
+    All arguments broadcast against each other (NumPy semantics).
+    """
+    fcf, growth, discount_rate, terminal_growth = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (fcf, growth, discount_rate, terminal_growth))
+    )
+    ratio = (1 + growth) / (1 + discount_rate)
+    ratio_n = ratio ** years
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Closed-form geometric sum of ratio^1 .. ratio^years
+        annuity = np.where(np.abs(1 - ratio) < 1e-12, years, ratio * (1 - ratio_n) / (1 - ratio))
+        terminal = ratio_n * (1 + terminal_growth) / (discount_rate - terminal_growth)
+
+    explicit = fcf * annuity
+    terminal = fcf * terminal
+
+    return explicit + terminal
+
+def implied_growth(market_cap, fcf, discount_rate, terminal_growth, years: int = DEFAULT_YEARS) -> np.ndarray:
+    """
+    Solves dcf_value(fcf, g, ...) == market_cap for g by vectorized bisection.
+    Every argument broadcasts, so a whole grid of discount rates and terminal
+    growth rates across many tickers is solved in one pass.
+    Returns NaN where no solution exists (non-positive FCF, discount rate not
+    above terminal growth, or a root outside GROWTH_BRACKET).
+    """
+    market_cap, fcf, discount_rate, terminal_growth = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (market_cap, fcf, discount_rate, terminal_growth))
+    )
+    low = np.full(market_cap.shape, GROWTH_BRACKET[0])
+    high = np.full(market_cap.shape, GROWTH_BRACKET[1])
+
+    valid = (fcf > 0) & (market_cap > 0) & (discount_rate > terminal_growth)
+    with np.errstate(invalid="ignore"):
+        valid &= dcf_value(fcf, low, discount_rate, terminal_growth, years) <= market_cap
+        valid &= dcf_value(fcf, high, discount_rate, terminal_growth, years) >= market_cap
+
+    # The DCF value is increasing in g for positive FCF, so plain bisection converges
+    for _ in range(BISECTION_STEPS):
+        mid = (low + high) / 2
+        with np.errstate(invalid="ignore"):
+            too_low = dcf_value(fcf, mid, discount_rate, terminal_growth, years) < market_cap
+        low = np.where(too_low, mid, low)
+        high = np.where(too_low, high, mid)
+
+    return np.where(valid, (low + high) / 2, np.nan)
+
+def load_dcf_inputs(tickers: list[str] | None = None) -> pd.DataFrame:
+    """
+    Collects price, free cash flow and share count for many tickers (all stored
+    tickers if None) with one query per table. FreeCashFlow falls back to
+    OperatingCashFlow, ShareIssued to OrdinarySharesNumber.
+    Returns a ticker-indexed DataFrame with price, fcf, shares and market_cap.
+    """
+    tickers = tickers if tickers is not None else etl.transform_tickers()
+    columns = ["price", "fcf", "shares", "market_cap"]
+    prices = etl.transform_latest_prices(tickers)
+    if prices.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index(tickers, name="ticker"), dtype=float)
+
+    fundamentals = pd.concat([
+        etl.transform_positions(tickers, "cashflow_stmt", ["FreeCashFlow", "OperatingCashFlow"]),
+        etl.transform_positions(tickers, "balance_sheet", ["ShareIssued", "OrdinarySharesNumber"])
+    ])
+    latest = (
+        fundamentals.dropna(subset=["entry"])
+        .sort_values("date")
+        .groupby(["ticker", "position"])["entry"].last()
+        .unstack("position")
+        .reindex(columns=["FreeCashFlow", "OperatingCashFlow", "ShareIssued", "OrdinarySharesNumber"])
+        .astype(float)
+    )
+
+    inputs = pd.DataFrame(index=pd.Index(tickers, name="ticker"))
+    inputs["price"] = prices["close"]
+    inputs["fcf"] = latest["FreeCashFlow"].fillna(latest["OperatingCashFlow"])
+    inputs["shares"] = latest["ShareIssued"].fillna(latest["OrdinarySharesNumber"])
+    inputs["market_cap"] = inputs["price"] * inputs["shares"]
+
+    return inputs[columns]
+
+def implied_growth_grid(inputs: pd.DataFrame, discount_rates, terminal_growths, years: int = DEFAULT_YEARS) -> np.ndarray:
+    """
+    Market-implied growth for every ticker in inputs over a grid of assumptions.
+    Returns an array shaped (tickers, discount_rates, terminal_growths).
+    """
+    market_cap = inputs["market_cap"].to_numpy(dtype=float)[:, None, None]
+    fcf = inputs["fcf"].to_numpy(dtype=float)[:, None, None]
+    rates = np.asarray(discount_rates, dtype=float)[None, :, None]
+    growths = np.asarray(terminal_growths, dtype=float)[None, None, :]
+
+    return implied_growth(market_cap, fcf, rates, growths, years)
+
+def sensitivity_table(implied: np.ndarray, discount_rates, terminal_growths) -> pd.DataFrame:
+    """
+    Formats one ticker's slice of implied_growth_grid as a table of implied growth (%):
+    Index=Discount Rate, Columns=Terminal Growth.
+    """
+    return pd.DataFrame(
+        np.asarray(implied) * 100,
+        index=pd.Index([f"{r:.1%}" for r in discount_rates], name="Discount Rate"),
+        columns=pd.Index([f"{g:.2%}" for g in terminal_growths], name="Terminal Growth")
+    )
@@ -1,259 +1,821 @@
-import yfinance as yf
 import pandas as pd
+import numpy as np
+import hashlib
 import sqlite3
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import logging
+import os
+import time
+import uuid
+import schema
+import price_store
+import providers
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DB_NAME = "financial_data.db"
+PRICE_BACKEND = os.environ.get("PRICE_BACKEND", "sqlite") # "sqlite" or "parquet" (see price_store.py)
+DEFAULT_MAX_WORKERS = 8
+CACHE_MAX_ENTRIES = 512
+NEWS_MAX_AGE = timedelta(hours=1) # refresh_news serves stored headlines younger than this
+# Candlestick resolution by age: daily bars for the last year, weekly for up to five years, monthly before that
+CHART_DAILY_WINDOW = pd.DateOffset(years=1)
+CHART_WEEKLY_WINDOW = pd.DateOffset(years=5)
+HISTORY_OVERLAP_DAYS = 7 # Re-fetch this many days before the latest stored bar to pick up revisions
+# Relative close difference in the overlap window that means the provider re-adjusted
+# the whole history (split or dividend), which triggers a full re-fetch
+HISTORY_ADJUSTMENT_TOLERANCE = 1e-4
+# load_universe skips stages fetched (per etl_runs) more recently than this, in seconds; 0 always fetches
+FRESHNESS_TTL = {
+    "history": float(os.environ.get("ETL_HISTORY_TTL", 12 * 60 * 60)),
+    "balance_sheet": float(os.environ.get("ETL_STATEMENT_TTL", 7 * 24 * 60 * 60)),
+    "income_stmt": float(os.environ.get("ETL_STATEMENT_TTL", 7 * 24 * 60 * 60)),
+    "cashflow_stmt": float(os.environ.get("ETL_STATEMENT_TTL", 7 * 24 * 60 * 60)),
+    "news": float(os.environ.get("ETL_NEWS_TTL", NEWS_MAX_AGE.total_seconds())),
+}
 
-def extract_history(ticker: str) -> pd.DataFrame:
+# Applied to every new connection. WAL lets dashboard readers keep reading while a refresh writes.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000, # 64 MB (negative values are KiB)
+    "mmap_size": 268435456, # 256 MB
+}
+
+_local = threading.local()
+
+# Source of all extracts, chosen by MARKET_DATA_PROVIDER (see providers.py); replace it to run offline
+provider = providers.get_provider()
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's connection to DB_NAME, opening, tuning and
+    migrating it to the current schema on first use.
+    Connections run in autocommit mode; use transaction() to group writes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    
+    conn = connections.get(DB_NAME)
+    if conn is None:
+        conn = sqlite3.connect(DB_NAME, timeout=30, isolation_level=None)
+        for pragma, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        schema.migrate(conn)
+        connections[DB_NAME] = conn
+    
+    return conn
+
+def close_connections():
+    """
+    Closes all connections opened by the current thread.
+    """
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+
+@contextmanager
+def transaction():
     """
-    Extracts stock history and news for a given ticker using yfinance.
+    Runs the enclosed writes in a single transaction on this thread's connection.
+    Nested calls join the outermost transaction, which commits on success and
+    rolls back on error.
     """
+    conn = get_connection()
+    depth = getattr(_local, "transaction_depth", 0)
+    if depth == 0:
+        # Take the write lock up front so concurrent writers wait (busy timeout)
+        # instead of failing when a read lock cannot be upgraded
+        conn.execute("BEGIN IMMEDIATE")
+    _local.transaction_depth = depth + 1
     try:
-        logger.info(f"Extracting history for {ticker}")
-        stock = yf.Ticker(ticker)
-        history = stock.history(period="max")
-        if history.empty:
-            return pd.DataFrame()
-            
-        history.reset_index(inplace=True)
-        history['Date'] = history['Date'] # .strftime('%Y-%m-%d')
+        yield conn
+        if depth == 0:
+            start = time.perf_counter()
+            conn.commit()
+            _local.commit_duration = time.perf_counter() - start
+    except BaseException:
+        # Includes a failed commit (e.g. SQLITE_BUSY), which would otherwise leave
+        # this thread's connection stuck inside the transaction
+        if depth == 0:
+            conn.rollback()
+        raise
+    finally:
+        _local.transaction_depth = depth
+
+def data_version(ticker: str) -> int:
+    """
+    Returns the ticker's data version, which every loader bumps when it writes.
+    """
+    row = get_connection().execute("SELECT version FROM stock_data_version WHERE ticker = ?", (ticker,)).fetchone()
+    return row[0] if row else 0
+
+def _bump_data_version(conn: sqlite3.Connection, ticker: str):
+    conn.execute("""
+        INSERT INTO stock_data_version (ticker, version) VALUES (?, 1)
+        ON CONFLICT (ticker) DO UPDATE SET version = version + 1
+    """, (ticker,))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+def cached_transform(fn):
+    """
+    Caches a transform_* function keyed on its arguments and the ticker's data version,
+    so results are reused until a loader writes new data for that ticker.
+    Callers receive copies and may modify them freely.
+    """
+    @functools.wraps(fn)
+    def wrapper(ticker: str, *args, **kwargs):
+        # Relative windows (e.g. days=90) depend on the current date as well
+        key = (DB_NAME, fn.__name__, ticker, args, tuple(sorted(kwargs.items())), datetime.now().date())
+        version = data_version(ticker)
         
-        return history
-    except Exception:
-        logger.error(f"Failed to extract history for {ticker}")
-        return pd.DataFrame()
+        with _cache_lock:
+            entry = _cache.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                _cache.move_to_end(key)
+                _cache_stats["hits"] += 1
+            else:
+                _cache_stats["misses"] += 1
+        
+        if hit:
+            _observe(fn.__name__, entry[1], cached=True)
+            return entry[1].copy()
+        
+        result = fn(ticker, *args, **kwargs)
+        
+        with _cache_lock:
+            _cache[key] = (version, result)
+            _cache.move_to_end(key)
+            while len(_cache) > CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        
+        _observe(fn.__name__, result)
+        return result.copy()
+    
+    return wrapper
 
-def extract_balance_sheet(ticker: str) -> pd.DataFrame:
+@contextmanager
+def observe_transforms(callback):
+    """
+    Calls callback(name, rows, cached) for every transform result returned on
+    this thread while active, e.g. to count the rows a dashboard render materializes.
+    """
+    previous = getattr(_local, "observer", None)
+    _local.observer = callback
     try:
-        logger.info(f"Extracting balance sheet for {ticker}")
-        stock = yf.Ticker(ticker)
-        balance_sheet = stock.get_balance_sheet()
-        return balance_sheet
-    except Exception:
-        logger.error(f"Failed to extract balance sheet for {ticker}")
+        yield
+    finally:
+        _local.observer = previous
+
+def _observe(name: str, result, cached: bool = False):
+    observer = getattr(_local, "observer", None)
+    if observer is not None:
+        observer(name, len(result), cached)
+
+def cache_stats() -> dict:
+    with _cache_lock:
+        return {**_cache_stats, "entries": len(_cache)}
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def latest_history_date(ticker: str) -> str | None:
+    """
+    Returns the most recent stored history date (YYYY-MM-DD) for a ticker,
+    or None if nothing has been stored yet.
+    """
+    if PRICE_BACKEND == "parquet":
+        return price_store.latest_date(ticker)
+    
+    row = get_connection().execute("SELECT MAX(date) FROM stock_history WHERE ticker = ?", (ticker,)).fetchone()
+    return row[0]
+
+def extract_history(ticker: str, full_refresh: bool = False) -> pd.DataFrame:
+    """
+    Extracts stock history for a given ticker from the market data provider.
+    Incremental by default: only bars from the latest stored date (minus an
+    overlap window for revisions) are requested. New tickers or
+    full_refresh=True fall back to a full backfill, as do tickers whose
+    overlap bars no longer match the stored ones (see _history_readjusted).
+    Raises providers.ProviderError if the request fails.
+    """
+    latest = None if full_refresh else latest_history_date(ticker)
+    if latest:
+        start = (pd.Timestamp(latest) - pd.Timedelta(days=HISTORY_OVERLAP_DAYS)).strftime('%Y-%m-%d')
+        logger.info(f"Extracting history for {ticker} since {start}")
+        history = _request(ticker, "history", lambda: provider.history(ticker, start=start))
+        if _history_readjusted(ticker, start, latest, history):
+            logger.info(f"Stored history for {ticker} is on an outdated split/dividend basis, extracting full history")
+            return extract_history(ticker, full_refresh=True)
+    else:
+        logger.info(f"Extracting full history for {ticker}")
+        history = _request(ticker, "history", lambda: provider.history(ticker))
+    if history.empty:
         return pd.DataFrame()
+        
+    history.reset_index(inplace=True)
+    
+    return history
+
+def _history_readjusted(ticker: str, start: str, latest: str, history: pd.DataFrame) -> bool:
+    """
+    True if fetched closes differ from the stored ones in the overlap window.
+    Prices are split- and dividend-adjusted, so after a corporate action every
+    older bar changes and the stored history has to be replaced. The latest
+    stored bar is left out, as it may have been an intraday snapshot.
+    """
+    if history.empty:
+        return False
+    
+    if PRICE_BACKEND == "parquet":
+        stored = price_store.read_history(ticker, start=pd.Timestamp(start))["close"]
+    else:
+        rows = get_connection().execute(
+            "SELECT date, close FROM stock_history WHERE ticker = ? AND date >= ?", (ticker, start)
+        ).fetchall()
+        stored = pd.Series([close for _, close in rows], index=pd.DatetimeIndex([date for date, _ in rows]), dtype=float)
+    stored = stored[stored.index < pd.Timestamp(latest)]
+    
+    fetched = pd.Series(history["Close"].to_numpy(), index=pd.DatetimeIndex(history.index).tz_localize(None).normalize())
+    common = stored.index.intersection(fetched.index)
+    if common.empty:
+        return False
+    
+    change = (fetched[common] / stored[common] - 1).abs()
+    return bool((change > HISTORY_ADJUSTMENT_TOLERANCE).any())
+
+def extract_balance_sheet(ticker: str) -> pd.DataFrame:
+    logger.info(f"Extracting balance sheet for {ticker}")
+    return _request(ticker, "balance sheet", lambda: provider.balance_sheet(ticker))
 
 def extract_income_stmt(ticker: str) -> pd.DataFrame:
-    try:
-        logger.info(f"Extracting income statement for {ticker}")
-        stock = yf.Ticker(ticker)
-        income_stmt = stock.get_income_stmt()
-        return income_stmt
-    except Exception:
-        logger.error(f"Failed to extract income statement for {ticker}")
-        return pd.DataFrame()
+    logger.info(f"Extracting income statement for {ticker}")
+    return _request(ticker, "income statement", lambda: provider.income_stmt(ticker))
 
 def extract_cashflow_stmt(ticker: str) -> pd.DataFrame:
+    logger.info(f"Extracting cashflow statement for {ticker}")
+    return _request(ticker, "cashflow statement", lambda: provider.cashflow(ticker))
+
+def _request(ticker: str, what: str, fn):
+    """
+    Runs a provider request, logging failures before re-raising them so
+    callers can record or retry them.
+    """
     try:
-        logger.info(f"Extracting cashflow statement for {ticker}")
-        stock = yf.Ticker(ticker)
-        cashflow_stmt = stock.get_cashflow()
-        return cashflow_stmt
-    except Exception:
-        logger.error(f"Failed to extract cashflow statement for {ticker}")
-        return pd.DataFrame()
+        return fn()
+    except providers.ProviderError as e:
+        logger.error(f"Failed to extract {what} for {ticker}: {e}")
+        raise
 
-def load_data(ticker: str):
-    load_history(ticker, extract_history(ticker))
-    load_balance_sheets(ticker, extract_balance_sheet(ticker))
-    load_income_stmt(ticker, extract_income_stmt(ticker))
-    load_cashflow_stmt(ticker, extract_cashflow_stmt(ticker))
+def extract_news(ticker: str) -> list[dict]:
+    """
+    Extracts the latest news for a ticker from the market data provider, normalized to dicts with
+    id, title, publisher, link and published_at (ISO 8601) keys, newest first.
+    """
+    logger.info(f"Extracting news for {ticker}")
+    news = []
+    for item in _request(ticker, "news", lambda: provider.news(ticker)) or []:
+        # Newer yfinance versions nest the article under "content"
+        content = item.get("content") or item
+        published = content.get("pubDate") or content.get("providerPublishTime")
+        link = (content.get("canonicalUrl") or {}).get("url") or content.get("link")
+        news.append({
+            # Fall back to a hash of the link/title so every article has a stable id
+            "id": item.get("id") or item.get("uuid") or content.get("id")
+                  or hashlib.sha1(f"{link}|{content.get('title', '')}".encode("utf-8")).hexdigest(),
+            "title": content.get("title", ""),
+            "publisher": (content.get("provider") or {}).get("displayName") or content.get("publisher"),
+            "link": link,
+            "published_at": (
+                pd.to_datetime(published, unit="s" if isinstance(published, (int, float)) else None, utc=True).isoformat()
+                if published else None
+            )
+        })
+    return sorted(news, key=lambda n: n["published_at"] or "", reverse=True)
 
-def load_history(ticker: str, history: pd.DataFrame):
+def load_data(ticker: str, full_refresh: bool = False):
     """
-    Loads stock history into a local SQLite database, avoiding duplicates.
+    Extracts all data for a ticker, then writes it (and the metrics derived
+    from it) in a single transaction.
     """
-    if history.empty:
-        return
+    load_stages(ticker, list(STAGES), full_refresh=full_refresh)
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock_history (
-            ticker TEXT,
-            date DATE,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume INTEGER,
-            PRIMARY KEY (ticker, date)
+def load_stages(ticker: str, stages: list[str], full_refresh: bool = False) -> dict[str, int]:
+    """
+    Extracts the given STAGES for a ticker, then writes them and refreshes the
+    metrics they affect in a single transaction. Every stage is timed and
+    recorded in etl_runs, whether it succeeds or not.
+    Returns the number of rows written per stage.
+    """
+    run = _start_run()
+    owns_commit = getattr(_local, "transaction_depth", 0) == 0
+    try:
+        data = {
+            stage: _timed_extract(_ledger_entry(run, ticker, stage), stage, STAGES[stage][0], ticker,
+                                  **({"full_refresh": full_refresh} if stage == "history" else {}))
+            for stage in stages
+        }
+        
+        with transaction():
+            written = {stage: _timed_load(_ledger_entry(run, ticker, stage), ticker, stage, data[stage]) for stage in stages}
+            statement_rows = sum(written.get(stage, 0) for stage in STATEMENT_STAGES)
+            refresh_metrics(ticker, written.get("history", 0), statement_rows, ledger=_ledger_entry(run, ticker, "metrics"))
+        
+        if owns_commit:
+            _ledger_entry(run, ticker, "commit")["load_duration"] = _local.commit_duration
+        return written
+    finally:
+        _record_run(run)
+
+def _start_run() -> dict:
+    return {"id": uuid.uuid4().hex[:12], "started_at": datetime.now().isoformat(timespec="seconds"), "entries": {}}
+
+def _ledger_entry(run: dict, ticker: str, stage: str) -> dict:
+    """
+    Returns the etl_runs record for (ticker, stage) in a run, creating it if needed.
+    """
+    key = (ticker, stage)
+    if key not in run["entries"]:
+        run["entries"][key] = dict.fromkeys(
+            ["extract_duration", "load_duration", "rows_fetched", "rows_inserted", "error"]
         )
-    """)
-    
-    data_to_insert = []
-    for _, row in history.iterrows():
-        data_to_insert.append((
-            ticker,
-            row['Date'].strftime('%Y-%m-%d'),
-            row['Open'],
-            row['High'],
-            row['Low'],
-            row['Close'],
-            row['Volume']
-        ))
+    return run["entries"][key]
+
+def _timed_extract(entry: dict, stage: str, extract, *args, **kwargs):
+    """
+    Runs an extract, recording its duration, the rows fetched (statement cells
+    for statements) and any error in the ledger entry. Safe to call from worker threads.
+    """
+    start = time.perf_counter()
+    try:
+        data = extract(*args, **kwargs)
+    except Exception as e:
+        entry["error"] = f"extract: {e}"
+        raise
+    finally:
+        entry["extract_duration"] = time.perf_counter() - start
     
-    cursor.executemany("""
-        INSERT OR IGNORE INTO stock_history (ticker, date, open, high, low, close, volume)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, data_to_insert)
+    entry["rows_fetched"] = 0 if data is None else int(data.size) if stage in STATEMENT_STAGES else len(data)
+    return data
+
+def _timed_load(entry: dict, ticker: str, stage: str, data) -> int:
+    """
+    Runs a stage's loader, recording its duration, the rows written and any error.
+    """
+    start = time.perf_counter()
+    try:
+        rows = STAGES[stage][1](ticker, data)
+    except Exception as e:
+        entry["error"] = f"load: {e}"
+        raise
+    finally:
+        entry["load_duration"] = time.perf_counter() - start
     
-    conn.commit()
-    conn.close()
+    entry["rows_inserted"] = rows
+    logger.info(
+        f"Loaded {stage} for {ticker}: {rows} of {entry['rows_fetched']} rows written in "
+        f"{entry['load_duration']:.3f}s (extract {entry['extract_duration'] or 0:.3f}s)"
+    )
+    return rows
 
-def load_balance_sheets(ticker: str, balance_sheets: pd.DataFrame):
-    if balance_sheets.empty:
+def _record_run(run: dict):
+    """
+    Writes a run's ledger entries to etl_runs, skipping stages that did not run.
+    """
+    entries = {key: e for key, e in run["entries"].items() if any(value is not None for value in e.values())}
+    if not entries:
         return
+    
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO etl_runs (run_id, ticker, stage, started_at, extract_duration, load_duration,
+                                  rows_fetched, rows_inserted, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (run["id"], ticker, stage, run["started_at"], e["extract_duration"], e["load_duration"],
+             e["rows_fetched"], e["rows_inserted"], e["error"])
+            for (ticker, stage), e in entries.items()
+        ])
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def etl_run_summary(by: str = "ticker", days: int = 7, limit: int = 10) -> pd.DataFrame:
+    """
+    Ranks tickers or stages (by="ticker" | "stage") by the total time spent in
+    ETL runs over the last `days` days, slowest first.
+    """
+    if by not in ("ticker", "stage"):
+        raise ValueError(f"Cannot summarize ETL runs by {by}")
     
-    # Ensure correct schema is present
+    since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+    return pd.read_sql_query(f"""
+        SELECT
+            {by},
+            COUNT(*) AS runs,
+            SUM(COALESCE(extract_duration, 0) + COALESCE(load_duration, 0)) AS total_duration,
+            AVG(COALESCE(extract_duration, 0) + COALESCE(load_duration, 0)) AS avg_duration,
+            MAX(COALESCE(extract_duration, 0) + COALESCE(load_duration, 0)) AS max_duration,
+            SUM(extract_duration) AS extract_duration,
+            SUM(load_duration) AS load_duration,
+            SUM(rows_fetched) AS rows_fetched,
+            SUM(rows_inserted) AS rows_inserted,
+            SUM(error IS NOT NULL) AS errors
+        FROM etl_runs
+        WHERE started_at >= ?
+        GROUP BY {by}
+        ORDER BY total_duration DESC
+        LIMIT ?
+    """, get_connection(), params=(since, limit), index_col=by)
+
+def prune_runs(days: int = 90) -> int:
+    """
+    Deletes etl_runs records older than `days` days. Returns the number deleted.
+    """
+    since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+    return get_connection().execute("DELETE FROM etl_runs WHERE started_at < ?", (since,)).rowcount
+
+def load_history(ticker: str, history: pd.DataFrame) -> int:
+    """
+    Loads stock history into the configured price backend (SQLite by default).
+    Existing bars are updated so that revisions in the overlap window are kept.
+    Returns the number of bars that were new or changed; the data version is
+    only bumped when there are any.
+    """
+    if history.empty:
+        return 0
+
+    if PRICE_BACKEND == "parquet":
+        bars = pd.DataFrame({
+            "date": pd.to_datetime(history['Date']).dt.tz_localize(None).dt.normalize(),
+            "open": history['Open'].to_numpy(),
+            "high": history['High'].to_numpy(),
+            "low": history['Low'].to_numpy(),
+            "close": history['Close'].to_numpy(),
+            "volume": history['Volume'].to_numpy()
+        })
+        rows = price_store.write_history(ticker, bars)
+        if rows:
+            with transaction() as conn:
+                _bump_data_version(conn, ticker)
+        return rows
+
+    with transaction() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock_balance_sheets (
-            ticker TEXT,
-            date DATE,
-            position TEXT,
-            entry REAL,
-            row_order INTEGER,
-            PRIMARY KEY (ticker, date, position)
+        # Convert whole columns at once instead of formatting row by row
+        dates = pd.to_datetime(history['Date']).dt.strftime('%Y-%m-%d')
+        data_to_insert = zip(
+            [ticker] * len(history),
+            dates.tolist(),
+            history['Open'].tolist(),
+            history['High'].tolist(),
+            history['Low'].tolist(),
+            history['Close'].tolist(),
+            history['Volume'].tolist()
         )
-    """)
-    
-    data_to_insert = []
-    for i, (position, row) in enumerate(balance_sheets.iterrows()):
-        for date, entry in row.items():
-            data_to_insert.append((
-                ticker,
-                date.strftime('%Y-%m-%d'),
-                position,
-                entry,
-                i
-        ))
     
-    cursor.executemany("""
-        INSERT OR IGNORE INTO stock_balance_sheets (ticker, date, position, entry, row_order)
-        VALUES (?, ?, ?, ?, ?)
-    """, data_to_insert)
+        # Bars re-fetched unchanged in the overlap window are neither rewritten nor counted
+        cursor.executemany("""
+            INSERT INTO stock_history (ticker, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ticker, date) DO UPDATE SET
+                open = excluded.open, high = excluded.high, low = excluded.low,
+                close = excluded.close, volume = excluded.volume
+            WHERE (open, high, low, close, volume)
+                IS NOT (excluded.open, excluded.high, excluded.low, excluded.close, excluded.volume)
+        """, data_to_insert)
+        if cursor.rowcount > 0:
+            _bump_data_version(conn, ticker)
+        
+    return cursor.rowcount
+
+def _statement_rows(ticker: str, statement: pd.DataFrame):
+    """
+    Flattens a statement (Index=Position, Columns=Date) into
+    (ticker, date, position, entry, row_order) tuples in one vectorized pass.
+    """
+    n_positions, n_dates = statement.shape
+    dates = pd.to_datetime(statement.columns).strftime('%Y-%m-%d')
     
-    conn.commit()
-    conn.close()
+    return zip(
+        [ticker] * (n_positions * n_dates),
+        np.tile(dates.to_numpy(dtype=object), n_positions).tolist(),
+        np.repeat(statement.index.to_numpy(dtype=object), n_dates).tolist(),
+        statement.to_numpy().ravel().tolist(),
+        np.repeat(np.arange(n_positions), n_dates).tolist()
+    )
 
-def load_income_stmt(ticker: str, income_stmt: pd.DataFrame):
-    if income_stmt.empty:
-        return
+def _load_statement(table_name: str, ticker: str, statement: pd.DataFrame) -> int:
+    """
+    Inserts new statement entries. Returns the number of rows actually inserted.
+    """
+    if statement.empty:
+        return 0
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(f"""
+            INSERT OR IGNORE INTO {table_name} (ticker, date, position, entry, row_order)
+            VALUES (?, ?, ?, ?, ?)
+        """, _statement_rows(ticker, statement))
+        if cursor.rowcount > 0:
+            _bump_data_version(conn, ticker)
     
-    # Ensure correct schema is present
+    return cursor.rowcount
+
+def load_balance_sheets(ticker: str, balance_sheets: pd.DataFrame) -> int:
+    return _load_statement("stock_balance_sheets", ticker, balance_sheets)
+
+def load_income_stmt(ticker: str, income_stmt: pd.DataFrame) -> int:
+    return _load_statement("stock_income_stmt", ticker, income_stmt)
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock_income_stmt (
-            ticker TEXT,
-            date DATE,
-            position TEXT,
-            entry REAL,
-            row_order INTEGER,
-            PRIMARY KEY (ticker, date, position)
-        )
-    """)
-    
-    data_to_insert = []
-    for i, (position, row) in enumerate(income_stmt.iterrows()):
-        for date, entry in row.items():
-            data_to_insert.append((
-                ticker,
-                date.strftime('%Y-%m-%d'),
-                position,
-                entry,
-                i
-        ))
+def load_cashflow_stmt(ticker: str, cashflow_stmt: pd.DataFrame) -> int:
+    return _load_statement("stock_cashflow_stmt", ticker, cashflow_stmt)
+
+def load_news(ticker: str, news: list[dict]) -> int:
+    """
+    Stores news items, skipping articles that are already stored (by id).
+    Returns the number of new articles.
+    """
+    if not news:
+        return 0
     
-    cursor.executemany("""
-        INSERT OR IGNORE INTO stock_income_stmt (ticker, date, position, entry, row_order)
-        VALUES (?, ?, ?, ?, ?)
-    """, data_to_insert)
+    fetched_at = datetime.now().isoformat(timespec="seconds")
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR IGNORE INTO stock_news (ticker, id, title, publisher, link, published_at, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (ticker, n["id"], n["title"], n.get("publisher"), n.get("link"), n.get("published_at"), fetched_at)
+            for n in news
+        ])
+        if cursor.rowcount > 0:
+            _bump_data_version(conn, ticker)
     
-    conn.commit()
-    conn.close()
+    return cursor.rowcount
+
+def refresh_news(ticker: str, limit: int = 5, max_age: timedelta = NEWS_MAX_AGE) -> list[dict]:
+    """
+    Returns the latest stored headlines, fetching new articles first if nothing
+    was stored for the ticker within max_age. If the fetch fails, the stored
+    headlines are returned as they are.
+    """
+    row = get_connection().execute("SELECT MAX(fetched_at) FROM stock_news WHERE ticker = ?", (ticker,)).fetchone()
+    if row[0] is None or datetime.fromisoformat(row[0]) < datetime.now() - max_age:
+        try:
+            load_news(ticker, extract_news(ticker))
+        except providers.ProviderError:
+            pass
     
-def load_cashflow_stmt(ticker: str, cashflow_stmt: pd.DataFrame):
-    if cashflow_stmt.empty:
-        return
+    return transform_news(ticker, limit=limit)
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def load_metrics(ticker: str, categories: list[str] | None = None) -> int:
+    """
+    Recomputes the metrics module outputs for a ticker and replaces them in stock_metrics.
+    Returns the number of metric values stored.
+    """
+    import metrics # metrics imports etl, so defer the import
     
-    # Ensure correct schema is present
+    categories = categories or metrics.METRIC_CATEGORIES
+    metrics_df = metrics.compute_metrics(ticker, categories)
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock_cashflow_stmt (
-            ticker TEXT,
-            date DATE,
-            position TEXT,
-            entry REAL,
-            row_order INTEGER,
-            PRIMARY KEY (ticker, date, position)
-        )
-    """)
-    
-    data_to_insert = []
-    for i, (position, row) in enumerate(cashflow_stmt.iterrows()):
-        for date, entry in row.items():
-            data_to_insert.append((
-                ticker,
-                date.strftime('%Y-%m-%d'),
-                position,
-                entry,
-                i
+    with transaction() as conn:
+        deleted = conn.execute(f"""
+            DELETE FROM stock_metrics
+            WHERE ticker = ? AND category IN ({",".join("?" * len(categories))})
+        """, [ticker, *categories]).rowcount
+        conn.executemany("""
+            INSERT INTO stock_metrics (ticker, category, metric, date, value, row_order)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, zip(
+            [ticker] * len(metrics_df),
+            metrics_df["category"].tolist(),
+            metrics_df["metric"].tolist(),
+            pd.to_datetime(metrics_df["date"]).dt.strftime('%Y-%m-%d').tolist(),
+            metrics_df["value"].astype(float).tolist(),
+            metrics_df["row_order"].astype(int).tolist()
         ))
+        # Nothing stored before or after: leave the ticker's cached transforms alone
+        if deleted or len(metrics_df):
+            _bump_data_version(conn, ticker)
     
-    cursor.executemany("""
-        INSERT OR IGNORE INTO stock_cashflow_stmt (ticker, date, position, entry, row_order)
-        VALUES (?, ?, ?, ?, ?)
-    """, data_to_insert)
+    return len(metrics_df)
+
+def backfill_metrics() -> int:
+    """
+    Computes metrics for tickers with an income statement but no stored metrics,
+    i.e. loaded before metrics were materialized. Returns the number of tickers backfilled.
+    """
+    tickers = [row[0] for row in get_connection().execute("""
+        SELECT DISTINCT ticker FROM stock_income_stmt
+        WHERE ticker NOT IN (SELECT ticker FROM stock_metrics)
+    """)]
+    for ticker in tickers:
+        load_metrics(ticker)
+    if tickers:
+        logger.info(f"Backfilled metrics for {len(tickers)} tickers")
+    return len(tickers)
+
+def refresh_metrics(ticker: str, history_rows: int, statement_rows: int, ledger: dict | None = None):
+    """
+    Post-load stage: recomputes only the metric categories affected by what was written.
+    If given, the ledger entry receives the duration, metric values stored and any error.
+    """
+    import metrics
+    
+    categories = []
+    if history_rows or statement_rows:
+        categories.append("valuation")
+    if statement_rows:
+        categories.extend(metrics.STATEMENT_METRICS)
+    if not categories:
+        return
     
-    conn.commit()
-    conn.close()
+    ledger = ledger if ledger is not None else {}
+    start = time.perf_counter()
+    try:
+        ledger["rows_inserted"] = load_metrics(ticker, categories)
+    except Exception as e:
+        logger.error(f"Failed to refresh metrics for {ticker}: {e}")
+        ledger["error"] = f"transform: {e}"
+    ledger["load_duration"] = time.perf_counter() - start
+
+# Stage name -> (extract, load) pairs making up one full ticker refresh
+STAGES = {
+    "history": (extract_history, load_history),
+    "balance_sheet": (extract_balance_sheet, load_balance_sheets),
+    "income_stmt": (extract_income_stmt, load_income_stmt),
+    "cashflow_stmt": (extract_cashflow_stmt, load_cashflow_stmt),
+    "news": (extract_news, load_news),
+}
+STATEMENT_STAGES = ["balance_sheet", "income_stmt", "cashflow_stmt"]
 
-def load_peers(ticker: str, peers: list[str]):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def load_peers(ticker: str, peers: list[str], max_workers: int = DEFAULT_MAX_WORKERS,
+               ttl: dict[str, float] | None = None) -> dict[str, dict]:
+    """
+    Loads all peers of a ticker concurrently, then stores the peer links.
+    Returns the per-ticker ingestion report of load_universe.
+    """
+    report = load_universe(peers, max_workers=max_workers, ttl=ttl)
+    load_peer_links(ticker, peers)
+    return report
+
+def load_peer_links(ticker: str, peers: list[str]):
+    """
+    Stores the (ticker, peer) relations without fetching any peer data.
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock_peers (
-            ticker TEXT,
-            peer TEXT,
-            PRIMARY KEY (ticker, peer)
-        )
-    """)
+        data_to_insert = [(ticker, peer) for peer in peers]
     
-    data_to_insert = []
-    for peer in peers:
-        data_to_insert.append((ticker, peer))
-        load_data(peer)
+        cursor.executemany("""
+            INSERT OR IGNORE INTO stock_peers (ticker, peer)
+            VALUES (?, ?)
+        """, data_to_insert)
+        if cursor.rowcount > 0:
+            _bump_data_version(conn, ticker)
+
+def load_universe(tickers: list[str], peers: dict[str, list[str]] | None = None,
+                  max_workers: int = DEFAULT_MAX_WORKERS, ttl: dict[str, float] | None = None) -> dict[str, dict]:
+    """
+    Loads many tickers (and optionally their peers) concurrently.
+    The peer graph is resolved first, so a ticker shared by several peer lists
+    is fetched once, and stages fetched within their freshness TTL (FRESHNESS_TTL
+    unless given; 0 always fetches) are skipped.
+    Every (ticker, statement) extract runs on a bounded thread pool, while all
+    SQLite writes happen on the calling thread in one transaction per ticker, so
+    the database only ever sees a single writer. Returns a report per ticker:
+    {"status": "ok" | "partial" | "failed", "missing": [...], "errors": [...], "fresh": [...]}
+    """
+    peers = peers or {}
+    ttl = {**FRESHNESS_TTL, **(ttl or {})}
+    universe = list(dict.fromkeys(
+        list(tickers) + [peer for ticker in tickers for peer in peers.get(ticker, [])]
+    ))
+    fresh = fresh_stages(universe, ttl)
+    report = {ticker: {"status": "ok", "missing": [], "errors": [], "fresh": fresh.get(ticker, [])} for ticker in universe}
+    run = _start_run()
+    
+    requested = len(tickers) + sum(len(peers.get(ticker, [])) for ticker in tickers)
+    skipped = sum(len(stages) for stages in fresh.values())
+    logger.info(
+        f"Loading {len(universe)} tickers ({requested - len(universe)} duplicates removed), "
+        f"skipping {skipped} of {len(universe) * len(STAGES)} fetches still within their freshness TTL"
+    )
+    
+    # Extracts finish in any order; a ticker is written (and committed) as soon as all of its
+    # stages are in, so the write lock is never held while requests are in flight
+    pending = {ticker: len(STAGES) - len(report[ticker]["fresh"]) for ticker in universe}
+    extracted = {ticker: {} for ticker in universe}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            # Ledger entries are created here, so worker threads only fill in their own dict
+            futures = {
+                pool.submit(_timed_extract, _ledger_entry(run, ticker, stage), stage, extract, ticker): (ticker, stage)
+                for ticker in universe
+                for stage, (extract, load) in STAGES.items()
+                if stage not in report[ticker]["fresh"]
+            }
+            for future in as_completed(futures):
+                ticker, stage = futures[future]
+                try:
+                    data = future.result()
+                    if data is None or len(data) == 0:
+                        report[ticker]["missing"].append(stage)
+                    else:
+                        extracted[ticker][stage] = data
+                except Exception as e:
+                    logger.error(f"Failed to load {stage} for {ticker}: {e}")
+                    report[ticker]["errors"].append(f"{stage}: {e}")
+                
+                pending[ticker] -= 1
+                if pending[ticker] == 0:
+                    _write_ticker(run, ticker, extracted.pop(ticker), report[ticker])
+        
+        with transaction():
+            for ticker in tickers:
+                if peers.get(ticker):
+                    load_peer_links(ticker, peers[ticker])
+    finally:
+        _record_run(run)
+    
+    for ticker, entry in report.items():
+        failed = len(entry["missing"]) + len(entry["errors"])
+        if failed == len(STAGES):
+            entry["status"] = "failed"
+        elif failed:
+            entry["status"] = "partial"
+    
+    return report
+
+def _write_ticker(run: dict, ticker: str, data: dict, report: dict):
+    """
+    Writes a ticker's extracted stages and refreshes its metrics in one transaction.
+    A stage whose loader fails is reported and skipped without losing the others.
+    """
+    owns_commit = getattr(_local, "transaction_depth", 0) == 0
+    written = dict.fromkeys(STAGES, 0)
+    
+    with transaction():
+        for stage, stage_data in data.items():
+            try:
+                written[stage] = _timed_load(_ledger_entry(run, ticker, stage), ticker, stage, stage_data)
+            except Exception as e:
+                logger.error(f"Failed to load {stage} for {ticker}: {e}")
+                report["errors"].append(f"{stage}: {e}")
+        
+        statement_rows = sum(written[stage] for stage in STATEMENT_STAGES)
+        refresh_metrics(ticker, written["history"], statement_rows, ledger=_ledger_entry(run, ticker, "metrics"))
     
-    cursor.executemany("""
-        INSERT OR IGNORE INTO stock_peers (ticker, peer)
-        VALUES (?, ?)
-    """, data_to_insert)
+    if owns_commit:
+        _ledger_entry(run, ticker, "commit")["load_duration"] = _local.commit_duration
+
+def fresh_stages(tickers: list[str], ttl: dict[str, float] = FRESHNESS_TTL) -> dict[str, list[str]]:
+    """
+    Returns, per ticker, the stages whose last successful non-empty fetch
+    recorded in etl_runs is younger than their TTL in seconds.
+    """
+    if not tickers or not any(ttl.get(stage, 0) > 0 for stage in STAGES):
+        return {}
+    
+    rows = get_connection().execute(f"""
+        SELECT ticker, stage, MAX(started_at)
+        FROM etl_runs
+        WHERE ticker IN ({",".join("?" * len(tickers))})
+          AND error IS NULL AND rows_fetched > 0
+        GROUP BY ticker, stage
+    """, list(tickers)).fetchall()
     
-    conn.commit()
-    conn.close()
+    now = datetime.now()
+    fresh = {}
+    for ticker, stage, started_at in rows:
+        if stage in STAGES and (now - datetime.fromisoformat(started_at)).total_seconds() < ttl.get(stage, 0):
+            fresh.setdefault(ticker, []).append(stage)
+    return fresh
 
+@cached_transform
 def transform_history(ticker: str, days: int = 90) -> pd.DataFrame:
     """
-    Retrieves data for the dashboard using a SQL Query.
+    Retrieves data for the dashboard using a SQL Query
+    (or a columnar scan when PRICE_BACKEND is "parquet").
     """
-    conn = sqlite3.connect(DB_NAME)
+    if PRICE_BACKEND == "parquet":
+        start = None if days == -1 else pd.Timestamp(datetime.now() - timedelta(days=days)).normalize()
+        return price_store.read_history(ticker, start=start)
+
+    conn = get_connection()
     if days == -1:
         query = """
         SELECT date, open, high, low, close, volume
@@ -276,16 +838,129 @@ def transform_history(ticker: str, days: int = 90) -> pd.DataFrame:
     
     df["date"] = pd.to_datetime(df["date"])
     df.set_index("date", inplace=True)
-    conn.close()
     
     return df
 
+def resample_ohlc(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Aggregates date-indexed OHLCV bars to a coarser period ("W", "M", ...):
+    open=first, high=max, low=min, close=last, volume=sum.
+    Bars are labelled with the start of their period.
+    """
+    if df.empty:
+        return df
+    
+    periods = df.index.to_period(freq)
+    resampled = df.groupby(periods).agg({
+        "open": "first",
+        "high": "max",
+        "low": "min",
+        "close": "last",
+        "volume": "sum"
+    })
+    resampled.index = resampled.index.start_time.astype(df.index.dtype)
+    resampled.index.name = df.index.name
+    
+    return resampled
+
+@cached_transform
+def transform_chart_history(ticker: str) -> pd.DataFrame:
+    """
+    Retrieves the full history at adaptive resolution for charting: daily bars
+    within CHART_DAILY_WINDOW, weekly bars within CHART_WEEKLY_WINDOW and monthly
+    bars before that, so the payload stays bounded for decades-long histories.
+    """
+    df = transform_history(ticker, days=-1)
+    if df.empty:
+        return df
+    
+    last_date = df.index.max()
+    # Align the cut-offs to period starts so no week or month is split
+    daily_start = (last_date - CHART_DAILY_WINDOW).to_period("W").start_time
+    weekly_start = (last_date - CHART_WEEKLY_WINDOW).to_period("M").start_time
+    
+    return pd.concat([
+        resample_ohlc(df[df.index < weekly_start], "M"),
+        resample_ohlc(df[(df.index >= weekly_start) & (df.index < daily_start)], "W"),
+        df[df.index >= daily_start]
+    ])
+
+def transform_tickers() -> list[str]:
+    """
+    Retrieves every ticker that has data stored.
+    """
+    query = "SELECT ticker FROM stock_data_version ORDER BY ticker"
+    return [row[0] for row in get_connection().execute(query)]
+
+def transform_latest_prices(tickers: list[str]) -> pd.DataFrame:
+    """
+    Retrieves the latest stored bar for many tickers in a single query.
+    Returns a ticker-indexed DataFrame with date and close columns.
+    """
+    if not tickers:
+        return pd.DataFrame(columns=["date", "close"], index=pd.Index([], name="ticker"))
+
+    if PRICE_BACKEND == "parquet":
+        rows = []
+        for ticker in tickers:
+            history = price_store.read_history(ticker)
+            if not history.empty:
+                rows.append((ticker, history.index[-1], history["close"].iloc[-1]))
+        df = pd.DataFrame(rows, columns=["ticker", "date", "close"])
+        _observe("transform_latest_prices", df)
+        return df.set_index("ticker")
+
+    placeholders = ",".join("?" * len(tickers))
+    query = f"""
+        SELECT h.ticker, h.date, h.close
+        FROM stock_history h
+        JOIN (
+            SELECT ticker, MAX(date) AS date
+            FROM stock_history
+            WHERE ticker IN ({placeholders})
+            GROUP BY ticker
+        ) latest ON latest.ticker = h.ticker AND latest.date = h.date
+    """
+    df = pd.read_sql_query(query, get_connection(), params=list(tickers))
+    df["date"] = pd.to_datetime(df["date"])
+    _observe("transform_latest_prices", df)
+    
+    return df.set_index("ticker")
+
+def transform_positions(tickers: list[str], statement_type: str, positions: list[str]) -> pd.DataFrame:
+    """
+    Retrieves selected positions of a financial statement for many tickers in a single query.
+    Returns a long DataFrame with ticker, date, position and entry columns (oldest first).
+    """
+    table_map = {
+        "balance_sheet": "stock_balance_sheets",
+        "income_stmt": "stock_income_stmt",
+        "cashflow_stmt": "stock_cashflow_stmt"
+    }
+    
+    if statement_type not in table_map or not tickers or not positions:
+        return pd.DataFrame(columns=["ticker", "date", "position", "entry"])
+    
+    query = f"""
+        SELECT ticker, date, position, entry
+        FROM {table_map[statement_type]}
+        WHERE ticker IN ({",".join("?" * len(tickers))})
+          AND position IN ({",".join("?" * len(positions))})
+        ORDER BY date ASC
+    """
+    df = pd.read_sql_query(query, get_connection(), params=list(tickers) + list(positions))
+    df["date"] = pd.to_datetime(df["date"])
+    _observe("transform_positions", df)
+    
+    return df
+
+@cached_transform
 def transform_financial_statement(ticker: str, statement_type: str) -> pd.DataFrame:
     """
     Retrieves a financial statement (balance_sheet, income_stmt, cashflow_stmt)
     and returns a pivoted DataFrame (Index=Position, Columns=Date).
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     
     table_map = {
         "balance_sheet": "stock_balance_sheets",
@@ -306,7 +981,6 @@ def transform_financial_statement(ticker: str, statement_type: str) -> pd.DataFr
     """
     
     df = pd.read_sql_query(query, conn, params=(ticker,))
-    conn.close()
     
     if df.empty:
         return pd.DataFrame()
@@ -327,13 +1001,52 @@ def transform_financial_statement(ticker: str, statement_type: str) -> pd.DataFr
     
     return pivoted
 
+@cached_transform
+def transform_metrics(ticker: str, category: str) -> pd.DataFrame:
+    """
+    Retrieves precomputed metrics of one category (valuation, margins, efficiency, growth)
+    and returns a pivoted DataFrame (Index=Metric, Columns=Date, newest first).
+    """
+    query = """
+    SELECT metric, date, value, row_order
+    FROM stock_metrics
+    WHERE ticker = ? AND category = ?
+    """
+    df = pd.read_sql_query(query, get_connection(), params=(ticker, category))
+    
+    if df.empty:
+        return pd.DataFrame()
+    
+    df["date"] = pd.to_datetime(df["date"])
+    pivoted = df.pivot(index="metric", columns="date", values="value")
+    pivoted = pivoted.sort_index(axis=1, ascending=False)
+    pivoted = pivoted.reindex(df.groupby("metric")["row_order"].min().sort_values().index)
+    
+    return pivoted
+
+@cached_transform
+def transform_news(ticker: str, limit: int = 5) -> list[dict]:
+    """
+    Retrieves the latest N stored headlines for a ticker, newest first.
+    """
+    query = """
+    SELECT id, title, publisher, link, published_at
+    FROM stock_news
+    WHERE ticker = ?
+    ORDER BY published_at DESC
+    LIMIT ?
+    """
+    cursor = get_connection().execute(query, (ticker, limit))
+    columns = [c[0] for c in cursor.description]
+    
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+@cached_transform
 def transform_peers(ticker: str) -> list[str]:
     """
     Retrieves the list of peers for a given ticker from the database.
     """
-    conn = sqlite3.connect(DB_NAME)
     query = "SELECT peer FROM stock_peers WHERE ticker = ?"
-    df = pd.read_sql_query(query, conn, params=(ticker,))
-    conn.close()
+    df = pd.read_sql_query(query, get_connection(), params=(ticker,))
     
     return df['peer'].tolist()
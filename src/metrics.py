@@ -3,6 +3,11 @@ import numpy as np
 import calendar
 import etl
 
+# Categories materialized into stock_metrics. Statement metrics only change with
+# the statements; valuation also changes with every new price.
+STATEMENT_METRICS = ["margins", "efficiency", "growth"]
+METRIC_CATEGORIES = ["valuation"] + STATEMENT_METRICS
+
 def get_first_available(df, keys, col):
     for k in keys:
         if k in df.index:
@@ -34,57 +39,123 @@ def calculate_growth_yoy(df: pd.DataFrame) -> pd.DataFrame:
         
     return growth_df
 
-def calculate_pe(ticker: str) -> pd.Series:
+def calculate_valuation_series(ticker: str, freq: str | None = None) -> pd.DataFrame:
     """
-    Calculates trailing P/E ratio for a given ticker.
+    Calculates P/E and P/B over the entire stored price history in one vectorized pass.
+    Every price date is aligned to the most recent fundamentals reported before it
+    (as-of join), so non-December fiscal years work as well. A position missing
+    from the latest filing keeps its last reported value, as in calculate_peer_valuation.
+    Optionally resamples prices to freq first (e.g. "W", "ME").
+    Returns a date-indexed DataFrame with close, DilutedEPS, ShareIssued,
+    StockholdersEquity, "P/E Ratio" and "P/B Ratio" columns.
     """
     history_df = etl.transform_history(ticker, days=-1)
-    income_stmt_df = etl.transform_financial_statement(ticker, statement_type="income_stmt")
+    fundamentals = pd.concat([
+        etl.transform_positions([ticker], "income_stmt", ["DilutedEPS"]),
+        etl.transform_positions([ticker], "balance_sheet", ["ShareIssued", "StockholdersEquity"])
+    ])
 
-    if history_df.empty or income_stmt_df.empty:
-        return pd.Series(name="P/E Ratio", dtype=float)
+    if history_df.empty or fundamentals.empty:
+        return pd.DataFrame(columns=["close", "DilutedEPS", "ShareIssued", "StockholdersEquity", "P/E Ratio", "P/B Ratio"], dtype=float)
+
+    close = history_df["close"]
+    if freq:
+        close = close.resample(freq).last().dropna()
 
+    reported = (
+        fundamentals.dropna(subset=["entry"])
+        .pivot_table(index="date", columns="position", values="entry", aggfunc="last")
+        .reindex(columns=["DilutedEPS", "ShareIssued", "StockholdersEquity"])
+        .astype(float)
+        .sort_index()
+        .ffill()
+    )
+    reported.index = reported.index.astype(close.index.dtype)
+
+    panel = pd.merge_asof(
+        close.rename("close").to_frame(), reported,
+        left_index=True, right_index=True,
+        direction="backward", allow_exact_matches=False
+    )
+    panel["P/E Ratio"] = panel["close"] / panel["DilutedEPS"].replace(0, np.nan)
+    panel["P/B Ratio"] = panel["close"] * panel["ShareIssued"] / panel["StockholdersEquity"].replace(0, np.nan)
+
+    return panel
+
+def _trailing_dates(history_df: pd.DataFrame) -> list[pd.Timestamp]:
+    """
+    The latest price date followed by the last days of the previous 11 months.
+    """
     dates = [pd.Timestamp(history_df.index[-1])]
     for i in range(1, 12):
         month = pd.Timestamp.today() - pd.DateOffset(months=i)
         _, last_day = calendar.monthrange(month.year, month.month)
         dates.append(pd.Timestamp(year=month.year, month=month.month, day=last_day))
+    return dates
 
-    pe_series = pd.Series(index=dates, name="P/E Ratio", dtype=float)
-    for date in dates:
-        trailing_year = (date - pd.DateOffset(years=1)).year
-        pe_val = history_df["close"].asof(date) / income_stmt_df.loc["DilutedEPS", f"{trailing_year}-12-31"] \
-            if income_stmt_df.loc["DilutedEPS", f"{trailing_year}-12-31"] != 0 else np.nan
-        pe_series[date] = pe_val
+def calculate_pe(ticker: str) -> pd.Series:
+    """
+    Calculates trailing P/E ratio for a given ticker.
+    """
+    valuation = calculate_valuation_series(ticker)
+    if valuation.empty:
+        return pd.Series(name="P/E Ratio", dtype=float)
+
+    dates = _trailing_dates(valuation)
+    pe_series = valuation["P/E Ratio"].reindex(pd.DatetimeIndex(dates).astype(valuation.index.dtype), method="ffill")
+    pe_series.index = dates
     
-    return pe_series
+    return pe_series.rename("P/E Ratio")
 
 def calculate_pb(ticker: str) -> pd.Series:
     """
     Calculates trailing P/B ratio for a given ticker.
     """
-    history_df = etl.transform_history(ticker, days=-1)
-    balance_sheet_df = etl.transform_financial_statement(ticker, statement_type="balance_sheet")
-
-    if history_df.empty or balance_sheet_df.empty:
+    valuation = calculate_valuation_series(ticker)
+    if valuation.empty:
         return pd.Series(name="P/B Ratio", dtype=float)
 
-    dates = [pd.Timestamp(history_df.index[-1])]
-    for i in range(1, 12):
-        month = pd.Timestamp.today() - pd.DateOffset(months=i)
-        _, last_day = calendar.monthrange(month.year, month.month)
-        dates.append(pd.Timestamp(year=month.year, month=month.month, day=last_day))
-
-    pb_series = pd.Series(index=dates, name="P/B Ratio", dtype=float)
-    for date in dates:
-        trailing_year = (date - pd.DateOffset(years=1)).year
-        market_cap = history_df["close"].asof(date) * balance_sheet_df.loc["ShareIssued", f"{trailing_year}-12-31"] \
-            if balance_sheet_df.loc["ShareIssued", f"{trailing_year}-12-31"] != 0 else np.nan
-        pb_val = market_cap / balance_sheet_df.loc["StockholdersEquity", f"{trailing_year}-12-31"] \
-            if balance_sheet_df.loc["StockholdersEquity", f"{trailing_year}-12-31"] != 0 else np.nan
-        pb_series[date] = pb_val
+    dates = _trailing_dates(valuation)
+    pb_series = valuation["P/B Ratio"].reindex(pd.DatetimeIndex(dates).astype(valuation.index.dtype), method="ffill")
+    pb_series.index = dates
     
-    return pb_series
+    return pb_series.rename("P/B Ratio")
+
+def calculate_peer_valuation(tickers: list[str]) -> pd.DataFrame:
+    """
+    Calculates the latest P/E and P/B ratio for a whole peer set at once.
+    Uses one query per table and the most recent fiscal year reported before
+    each ticker's latest price. Returns a ticker-indexed DataFrame with
+    "P/E Ratio" and "P/B Ratio" columns (in the order of tickers).
+    """
+    columns = ["P/E Ratio", "P/B Ratio"]
+    prices = etl.transform_latest_prices(tickers)
+    if prices.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index(tickers, name="ticker"), dtype=float)
+
+    fundamentals = pd.concat([
+        etl.transform_positions(tickers, "income_stmt", ["DilutedEPS"]),
+        etl.transform_positions(tickers, "balance_sheet", ["ShareIssued", "StockholdersEquity"])
+    ])
+
+    # Keep only figures reported before the price date, then take the latest per position
+    fundamentals = fundamentals.merge(prices["date"].rename("price_date").reset_index(), on="ticker")
+    fundamentals = fundamentals[fundamentals["date"] < fundamentals["price_date"]]
+    latest = (
+        fundamentals.dropna(subset=["entry"])
+        .sort_values("date")
+        .groupby(["ticker", "position"])["entry"].last()
+        .unstack("position")
+        .reindex(columns=["DilutedEPS", "ShareIssued", "StockholdersEquity"])
+    )
+
+    panel = prices.join(latest, how="left")
+    valuation = pd.DataFrame({
+        "P/E Ratio": panel["close"] / panel["DilutedEPS"].replace(0, np.nan),
+        "P/B Ratio": panel["close"] * panel["ShareIssued"] / panel["StockholdersEquity"].replace(0, np.nan)
+    })
+
+    return valuation.reindex(pd.Index(tickers, name="ticker"))
 
 def calculate_margins(income_stmt_df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -141,3 +212,43 @@ def calculate_efficiency_ratios(balance_sheet: pd.DataFrame, income_stmt: pd.Dat
         ratios[col] = [roe, roa]
         
     return ratios
+
+def _to_long(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """
+    Melts a metric table (Index=Metric, Columns=Date) into long rows.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=["category", "metric", "date", "value", "row_order"])
+
+    # Missing values are kept (stored as NULL) so every metric row survives the round trip
+    n_metrics, n_dates = df.shape
+    return pd.DataFrame({
+        "category": category,
+        "metric": np.repeat(df.index.to_numpy(dtype=object), n_dates),
+        "date": np.tile(pd.to_datetime(df.columns).strftime('%Y-%m-%d').to_numpy(dtype=object), n_metrics),
+        "value": df.to_numpy(dtype=float).ravel(),
+        "row_order": np.repeat(np.arange(n_metrics), n_dates)
+    })
+
+def compute_metrics(ticker: str, categories: list[str] | None = None) -> pd.DataFrame:
+    """
+    Computes the dashboard metrics of a ticker in long format
+    (category, metric, date, value, row_order), as stored in stock_metrics.
+    """
+    categories = categories or METRIC_CATEGORIES
+    inc_df = etl.transform_financial_statement(ticker, "income_stmt")
+    bs_df = etl.transform_financial_statement(ticker, "balance_sheet")
+
+    tables = {}
+    if "valuation" in categories:
+        tables["valuation"] = pd.DataFrame({"P/E Ratio": calculate_pe(ticker), "P/B Ratio": calculate_pb(ticker)}).transpose()
+    if "margins" in categories:
+        tables["margins"] = calculate_margins(inc_df)
+    if "efficiency" in categories:
+        tables["efficiency"] = calculate_efficiency_ratios(bs_df, inc_df)
+    if "growth" in categories:
+        growth = calculate_growth_yoy(inc_df)
+        growth.columns = [col.removesuffix(" (YoY)") for col in growth.columns]
+        tables["growth"] = growth
+
+    return pd.concat([_to_long(df, category) for category, df in tables.items()], ignore_index=True)
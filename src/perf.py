@@ -0,0 +1,86 @@
+import time
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+import etl
+
+class RenderProfiler:
+    """
+    Collects timings, SQLite statements and materialized transform rows per
+    section of one dashboard rerun. Sections nest; a nested section is
+    reported as "parent / child" and its cost is included in its parent.
+    When disabled every method is a no-op, so the dashboard pays nothing.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.sections = []
+        self.transforms = {}
+        self._stack = []
+        self._queries = 0
+        self._rows = 0
+        self._start = time.perf_counter()
+
+    def _on_query(self, statement: str):
+        self._queries += 1
+
+    def _on_transform(self, name: str, rows: int, cached: bool):
+        self._rows += rows
+        calls, total_rows, hits = self.transforms.get(name, (0, 0, 0))
+        self.transforms[name] = (calls + 1, total_rows + rows, hits + int(cached))
+
+    @contextmanager
+    def run(self):
+        """
+        Activates query and row counting on this thread for the whole rerun.
+        """
+        if not self.enabled:
+            yield self
+            return
+
+        conn = etl.get_connection()
+        conn.set_trace_callback(self._on_query)
+        try:
+            with etl.observe_transforms(self._on_transform):
+                yield self
+        finally:
+            conn.set_trace_callback(None)
+
+    def section(self, name: str):
+        """
+        Context manager timing the enclosed code as one section.
+        """
+        return self._section(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _section(self, name: str):
+        self._stack.append(name)
+        # Recorded on entry so the summary lists parents before their children
+        record = {"section": " / ".join(self._stack)}
+        self.sections.append(record)
+        queries, rows = self._queries, self._rows
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["ms"] = (time.perf_counter() - start) * 1000
+            record["queries"] = self._queries - queries
+            record["rows"] = self._rows - rows
+            self._stack.pop()
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns one row per section in render order.
+        """
+        return pd.DataFrame(self.sections, columns=["section", "ms", "queries", "rows"]).set_index("section").round(1)
+
+    def transform_summary(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [(name, calls, rows, hits) for name, (calls, rows, hits) in self.transforms.items()],
+            columns=["transform", "calls", "rows", "cache hits"]
+        ).set_index("transform").sort_values("rows", ascending=False)
+
+    def totals(self) -> dict:
+        return {
+            "ms": (time.perf_counter() - self._start) * 1000,
+            "queries": self._queries,
+            "rows": self._rows,
+        }
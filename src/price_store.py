@@ -0,0 +1,81 @@
+import os
+import threading
+import pandas as pd
+
+# Columnar OHLCV store, one Parquet file per ticker partition:
+#   <PARQUET_DIR>/ticker=<TICKER>/history.parquet
+# Selected in etl via PRICE_BACKEND=parquet. Requires pyarrow.
+PARQUET_DIR = os.environ.get("PRICE_PARQUET_DIR", "price_store")
+COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+_write_lock = threading.Lock()
+
+def _require_pyarrow():
+    try:
+        import pyarrow # noqa: F401
+    except ImportError as e:
+        raise ImportError("The parquet price backend requires pyarrow (pip install pyarrow)") from e
+
+def _partition_path(ticker: str) -> str:
+    return os.path.join(PARQUET_DIR, f"ticker={ticker}", "history.parquet")
+
+def read_history(ticker: str, start: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Reads a ticker's bars (optionally from start on) as a date-indexed frame.
+    Dates come back as typed datetime64 values, no string parsing involved.
+    """
+    _require_pyarrow()
+    path = _partition_path(ticker)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS[1:], index=pd.DatetimeIndex([], name="date"))
+
+    filters = [("date", ">=", start)] if start is not None else None
+    df = pd.read_parquet(path, engine="pyarrow", filters=filters)
+
+    return df.set_index("date").sort_index()
+
+def latest_date(ticker: str) -> str | None:
+    """
+    Returns the most recent stored date (YYYY-MM-DD) for a ticker, or None.
+    """
+    _require_pyarrow()
+    path = _partition_path(ticker)
+    if not os.path.exists(path):
+        return None
+
+    dates = pd.read_parquet(path, engine="pyarrow", columns=["date"])["date"]
+    return dates.max().strftime('%Y-%m-%d') if not dates.empty else None
+
+def write_history(ticker: str, bars: pd.DataFrame) -> int:
+    """
+    Merges bars (columns: date, open, high, low, close, volume) into the
+    ticker's partition. Newer values win for dates that are already stored.
+    Returns the number of bars that were new or changed; the partition is not
+    rewritten when there are none.
+    """
+    _require_pyarrow()
+    path = _partition_path(ticker)
+
+    with _write_lock:
+        changed = len(bars)
+        if os.path.exists(path):
+            existing = pd.read_parquet(path, engine="pyarrow")
+            changed -= len(bars[COLUMNS].merge(existing, on=COLUMNS))
+            if changed == 0:
+                return 0
+            bars = pd.concat([existing, bars[COLUMNS]], ignore_index=True)
+
+        bars = (
+            bars[COLUMNS]
+            .drop_duplicates(subset="date", keep="last")
+            .sort_values("date")
+            .reset_index(drop=True)
+        )
+
+        # Write to a temporary file first so readers never see a partial partition
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        bars.to_parquet(tmp_path, engine="pyarrow", index=False)
+        os.replace(tmp_path, path)
+
+    return changed
@@ -0,0 +1,467 @@
+import json
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance") # "yfinance" or "fixture"
+FIXTURE_DIR = os.environ.get("FIXTURE_DIR", "fixtures")
+# Outbound yfinance request budget, shared by all threads
+PROVIDER_RATE = float(os.environ.get("PROVIDER_RATE", 2.0)) # Requests per second
+PROVIDER_BURST = int(os.environ.get("PROVIDER_BURST", 5))
+
+class ProviderError(Exception):
+    """
+    Raised when a market-data request fails or is refused.
+    """
+
+class CircuitOpenError(ProviderError):
+    """
+    Raised instead of calling the provider while the circuit breaker is open.
+    """
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average and
+    bursts of up to `capacity`. A rate of None disables limiting.
+    """
+    def __init__(self, rate: float | None, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes one token, sleeping until one is available.
+        Returns the time spent waiting (seconds).
+        """
+        if self.rate is None:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now; a negative balance queues later callers behind us
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> bool:
+        """
+        Counts a failure. Returns True if this failure opened the circuit.
+        """
+        with self._lock:
+            self.failures += 1
+            reopen = self._trial
+            self._trial = False
+            if reopen or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+class ProviderClient:
+    """
+    Guards every request to a market-data library:
+    - one client object per symbol (e.g. a yf.Ticker, which holds its HTTP
+      session and lookups) is reused for `client_ttl` seconds, so the extracts
+      of one refresh share it while later refreshes still see fresh data
+    - a TokenBucket limits the request rate across all threads
+    - a CircuitBreaker stops hammering the provider after repeated failures
+    `factory(symbol)` builds the per-symbol client; tests can pass a fake that
+    injects errors and latency.
+    """
+    def __init__(self, factory, rate: float | None = 2.0, burst: int = 5,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 client_ttl: float = 300.0, max_clients: int = 256,
+                 throttle_errors: tuple[type[Exception], ...] = ()):
+        self.factory = factory
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.client_ttl = client_ttl
+        self.max_clients = max_clients
+        self.throttle_errors = throttle_errors
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(["requests", "failures", "throttled", "rejected", "delayed", "clients_created"], 0)
+        self._wait_time = 0.0
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def client(self, symbol: str):
+        """
+        Returns the cached client for a symbol, creating it if missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.get(symbol)
+            if entry is not None and now - entry[0] < self.client_ttl:
+                self._clients.move_to_end(symbol)
+                return entry[1]
+
+        client = self.factory(symbol)
+        with self._lock:
+            self._clients[symbol] = (now, client)
+            self._clients.move_to_end(symbol)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            self._counters["clients_created"] += 1
+        return client
+
+    def call(self, symbol: str, fn):
+        """
+        Runs fn(client) for a symbol under the rate limit and circuit breaker.
+        Raises CircuitOpenError while the circuit is open and ProviderError
+        (chained to the original exception) when the request fails.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"Circuit open, skipping request for {symbol}")
+
+        waited = self.limiter.acquire()
+        with self._lock:
+            self._counters["requests"] += 1
+            if waited > 0:
+                self._counters["delayed"] += 1
+                self._wait_time += waited
+
+        try:
+            result = fn(self.client(symbol))
+        except Exception as e:
+            self._count("throttled" if isinstance(e, self.throttle_errors) else "failures")
+            if self.breaker.record_failure():
+                logger.warning(f"Circuit opened after {self.breaker.failures} consecutive provider failures")
+            # Drop the client so the next attempt starts from a clean session
+            with self._lock:
+                self._clients.pop(symbol, None)
+            raise ProviderError(f"Request for {symbol} failed: {e}") from e
+
+        self.breaker.record_success()
+        return result
+
+    def stats(self) -> dict:
+        """
+        Returns request counters, total rate-limit wait time and the breaker state.
+        """
+        with self._lock:
+            stats = dict(self._counters, wait_time=round(self._wait_time, 3))
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def reset(self):
+        """
+        Drops cached clients, counters and breaker state.
+        """
+        with self._lock:
+            self._clients.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+            self._wait_time = 0.0
+        self.breaker.record_success()
+
+class MarketDataProvider(ABC):
+    """
+    Source of raw market data for the extract_* functions in etl.
+    Return values follow yfinance conventions:
+    - history: Date-indexed DataFrame with Open, High, Low, Close, Volume
+    - statements: DataFrame with one row per position and one column per period end
+    - news: list of article dicts (flat or nested under "content")
+    Implementations raise ProviderError when a request fails, and cannot be
+    created unless they implement every data method.
+    """
+    name = "base"
+
+    @abstractmethod
+    def history(self, ticker: str, start: str | None = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def balance_sheet(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def income_stmt(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def cashflow(self, ticker: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @abstractmethod
+    def news(self, ticker: str) -> list[dict]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live data from yfinance, guarded by a ProviderClient (rate limit, circuit
+    breaker, one Ticker per symbol). `factory` replaces yf.Ticker in tests.
+    yfinance itself is only imported on the first request.
+    """
+    name = "yfinance"
+
+    def __init__(self, factory=None, rate: float | None = PROVIDER_RATE, burst: int = PROVIDER_BURST, **client_options):
+        self._factory = factory
+        self._client_options = dict(client_options, rate=rate, burst=burst)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> ProviderClient:
+        # Built once under a lock: threads racing on the first request must share
+        # one rate limit and circuit breaker
+        with self._client_lock:
+            if self._client is None:
+                import yfinance as yf # Slow to import and only needed when actually fetching
+
+                # By default yfinance logs failed history requests and returns an empty frame,
+                # which the circuit breaker would never see
+                yf.config.debug.hide_exceptions = False
+                self._client_options.setdefault("throttle_errors", (yf.exceptions.YFRateLimitError,))
+                self._client = ProviderClient(self._factory or yf.Ticker, **self._client_options)
+            return self._client
+
+    def history(self, ticker: str, start: str | None = None) -> pd.DataFrame:
+        if start:
+            return self.client.call(ticker, lambda stock: stock.history(start=start))
+        return self.client.call(ticker, lambda stock: stock.history(period="max"))
+
+    def balance_sheet(self, ticker: str) -> pd.DataFrame:
+        return self.client.call(ticker, lambda stock: stock.get_balance_sheet())
+
+    def income_stmt(self, ticker: str) -> pd.DataFrame:
+        return self.client.call(ticker, lambda stock: stock.get_income_stmt())
+
+    def cashflow(self, ticker: str) -> pd.DataFrame:
+        return self.client.call(ticker, lambda stock: stock.get_cashflow())
+
+    def news(self, ticker: str) -> list[dict]:
+        return self.client.call(ticker, lambda stock: stock.news)
+
+    def stats(self) -> dict:
+        return self.client.stats()
+
+# Statement kind -> positions synthesized by FixtureProvider, as (name, share of revenue) pairs
+SYNTHETIC_POSITIONS = {
+    "balance_sheet": [
+        ("TotalAssets", 2.5), ("TotalLiabilitiesNetMinorityInterest", 1.5), ("StockholdersEquity", 1.0),
+    ],
+    "income_stmt": [
+        ("TotalRevenue", 1.0), ("OperatingRevenue", 1.0), ("GrossProfit", 0.45), ("OperatingIncome", 0.2),
+        ("EBIT", 0.2), ("PretaxIncome", 0.18), ("NetIncome", 0.14), ("NetIncomeCommonStockholders", 0.14),
+    ],
+    "cashflow": [
+        ("OperatingCashFlow", 0.22), ("CapitalExpenditure", -0.06), ("FreeCashFlow", 0.16),
+    ],
+}
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Offline data for tests and benchmarks. Reads <path>/<TICKER>/<kind>.parquet
+    or .csv (kind: history, balance_sheet, income_stmt, cashflow) and
+    news.json when present, and otherwise synthesizes deterministic data seeded
+    by the ticker, so every run sees the same bars and statements.
+    `latency` adds a fixed delay per request to mimic a network round-trip.
+    """
+    name = "fixture"
+
+    def __init__(self, path: str | None = FIXTURE_DIR, years: int = 20, statement_years: int = 4,
+                 end: str | None = None, latency: float = 0.0):
+        self.path = path
+        self.years = years
+        self.statement_years = statement_years
+        self.end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+        self.latency = latency
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        with self._lock:
+            self._requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _file(self, ticker: str, kind: str) -> str | None:
+        if not self.path:
+            return None
+        for extension in (".parquet", ".csv"):
+            file = os.path.join(self.path, ticker, kind + extension)
+            if os.path.exists(file):
+                return file
+        return None
+
+    def _seed(self, ticker: str, kind: str) -> int:
+        return zlib.crc32(f"{ticker}:{kind}".encode("utf-8"))
+
+    def _shares(self, ticker: str) -> float:
+        return float(np.random.default_rng(self._seed(ticker, "shares")).integers(50, 5000)) * 1e6
+
+    def _revenue(self, ticker: str) -> np.ndarray:
+        # Newest first, growing a few percent a year
+        rng = np.random.default_rng(self._seed(ticker, "revenue"))
+        return float(rng.uniform(1e9, 1e11)) * np.cumprod(1 + rng.normal(0.04, 0.05, self.statement_years))[::-1]
+
+    def history(self, ticker: str, start: str | None = None) -> pd.DataFrame:
+        self._request()
+        file = self._file(ticker, "history")
+        if file:
+            if file.endswith(".parquet"):
+                history = pd.read_parquet(file)
+                dates = pd.to_datetime(history.pop("Date"))
+            else:
+                # CSV keeps only UTC offsets, which change across DST; keep each bar's local
+                # wall-clock date (like the SQLite store) instead of one mixed-offset column
+                history = pd.read_csv(file)
+                dates = [pd.Timestamp(date).tz_localize(None) for date in history.pop("Date")]
+            history = history.set_index(pd.DatetimeIndex(dates, name="Date"))
+        else:
+            history = self._synthetic_history(ticker)
+        if start:
+            history = history[history.index.tz_localize(None) >= pd.Timestamp(start)]
+        return history
+
+    def _synthetic_history(self, ticker: str) -> pd.DataFrame:
+        rng = np.random.default_rng(self._seed(ticker, "history"))
+        dates = pd.bdate_range(end=self.end, periods=self.years * 261, name="Date")
+        close = np.exp(np.cumsum(rng.normal(0.0002, 0.015, len(dates))))
+        # Scale the walk so the latest close trades at a plausible P/E on the synthetic earnings
+        earnings = self._revenue(ticker)[0] * dict(SYNTHETIC_POSITIONS["income_stmt"])["NetIncome"]
+        close *= float(rng.uniform(10, 30)) * earnings / self._shares(ticker) / close[-1]
+        open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+        spread = np.abs(rng.normal(0, 0.01, len(dates)))
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(10_000, 5_000_000, len(dates)),
+        }, index=dates)
+
+    def _statement(self, ticker: str, kind: str) -> pd.DataFrame:
+        self._request()
+        file = self._file(ticker, kind)
+        if file:
+            statement = pd.read_parquet(file) if file.endswith(".parquet") else pd.read_csv(file, index_col=0)
+            statement.columns = pd.to_datetime(statement.columns)
+            return statement
+
+        rng = np.random.default_rng(self._seed(ticker, kind))
+        # Fiscal years end in December, newest first like yfinance
+        last_year = self.end.year - 1
+        dates = pd.to_datetime([f"{last_year - i}-12-31" for i in range(self.statement_years)])
+        revenue = self._revenue(ticker)
+        rows = {name: revenue * share * (1 + rng.normal(0, 0.05, self.statement_years))
+                for name, share in SYNTHETIC_POSITIONS[kind]}
+        if kind == "balance_sheet":
+            rows["ShareIssued"] = rows["OrdinarySharesNumber"] = np.full(self.statement_years, self._shares(ticker))
+        if kind == "income_stmt":
+            rows["DilutedEPS"] = rows["NetIncome"] / self._shares(ticker)
+        return pd.DataFrame(rows, index=dates).T
+
+    def balance_sheet(self, ticker: str) -> pd.DataFrame:
+        return self._statement(ticker, "balance_sheet")
+
+    def income_stmt(self, ticker: str) -> pd.DataFrame:
+        return self._statement(ticker, "income_stmt")
+
+    def cashflow(self, ticker: str) -> pd.DataFrame:
+        return self._statement(ticker, "cashflow")
+
+    def news(self, ticker: str) -> list[dict]:
+        self._request()
+        file = os.path.join(self.path, ticker, "news.json") if self.path else None
+        if file and os.path.exists(file):
+            with open(file, encoding="utf-8") as f:
+                return json.load(f)
+        return [{
+            "id": f"{ticker}-{self.end:%Y%m%d}-{i}",
+            "title": f"{ticker} fixture headline {i + 1}",
+            "publisher": "Fixture Wire",
+            "link": None,
+            "providerPublishTime": int((self.end - pd.Timedelta(hours=i)).timestamp()),
+        } for i in range(5)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self._requests}
+
+def write_fixtures(source: MarketDataProvider, tickers: list[str], path: str = FIXTURE_DIR):
+    """
+    Captures data from `source` (e.g. a YFinanceProvider) as Parquet/JSON
+    fixtures that FixtureProvider(path) replays offline.
+    """
+    for ticker in tickers:
+        directory = os.path.join(path, ticker)
+        os.makedirs(directory, exist_ok=True)
+        source.history(ticker).reset_index().to_parquet(os.path.join(directory, "history.parquet"))
+        for kind in ("balance_sheet", "income_stmt", "cashflow"):
+            statement = getattr(source, kind)(ticker)
+            statement.columns = [pd.Timestamp(c).strftime("%Y-%m-%d") for c in statement.columns]
+            statement.to_parquet(os.path.join(directory, f"{kind}.parquet"))
+        with open(os.path.join(directory, "news.json"), "w", encoding="utf-8") as f:
+            json.dump(source.news(ticker), f, default=str)
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "fixture": FixtureProvider,
+}
+
+def get_provider(name: str | None = None, **options) -> MarketDataProvider:
+    """
+    Builds the provider named `name` (default: MARKET_DATA_PROVIDER).
+    """
+    name = name or MARKET_DATA_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name} (choose from {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](**options)
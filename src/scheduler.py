@@ -0,0 +1,189 @@
+import argparse
+import os
+import time
+import etl
+
+logger = etl.logger
+
+# Job kind -> ETL stages it refreshes, and how often each kind is due (seconds).
+# News has its own kind so that a news outage never holds back price refreshes.
+JOB_STAGES = {
+    "prices": ["history"],
+    "news": ["news"],
+    "statements": etl.STATEMENT_STAGES,
+}
+JOB_INTERVALS = {
+    "prices": float(os.environ.get("SCHEDULER_PRICE_INTERVAL", 60 * 60)),
+    "news": float(os.environ.get("SCHEDULER_NEWS_INTERVAL", 60 * 60)),
+    "statements": float(os.environ.get("SCHEDULER_STATEMENT_INTERVAL", 7 * 24 * 60 * 60)),
+}
+POLL_INTERVAL = float(os.environ.get("SCHEDULER_POLL_INTERVAL", 5))
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 60 # Seconds before the first retry, doubled on every further attempt
+JOB_RETENTION = 30 * 24 * 60 * 60 # Finished jobs older than this are pruned
+LEASE_TIMEOUT = float(os.environ.get("SCHEDULER_LEASE_TIMEOUT", 30 * 60)) # Running jobs claimed longer ago are presumed dead
+
+def enqueue(ticker: str, kind: str, due_at: float | None = None):
+    """
+    Queues a refresh of one kind (see JOB_STAGES) for a ticker, due now by default.
+    If the ticker already has an open job of that kind, it is moved forward
+    to due_at instead of being queued twice.
+    """
+    if kind not in JOB_STAGES:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    now = time.time()
+    etl.get_connection().execute("""
+        INSERT INTO scheduler_jobs (ticker, kind, due_at, created_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (ticker, kind) WHERE status IN ('pending', 'running')
+        DO UPDATE SET due_at = MIN(due_at, excluded.due_at)
+    """, (ticker, kind, due_at if due_at is not None else now, now))
+
+def schedule_due(tickers: list[str]) -> int:
+    """
+    Queues every (ticker, kind) whose last finished refresh is older than its
+    JOB_INTERVALS cadence and that has no open job yet. Jobs that exhausted
+    their retries are therefore retried on the next regular cycle.
+    Returns the number of jobs queued.
+    """
+    now = time.time()
+    queued = 0
+
+    with etl.transaction() as conn:
+        for kind, interval in JOB_INTERVALS.items():
+            for ticker in tickers:
+                row = conn.execute("""
+                    SELECT
+                        (SELECT MAX(finished_at) FROM scheduler_jobs
+                         WHERE ticker = ? AND kind = ? AND status IN ('done', 'failed')),
+                        EXISTS (SELECT 1 FROM scheduler_jobs
+                                WHERE ticker = ? AND kind = ? AND status IN ('pending', 'running'))
+                """, (ticker, kind, ticker, kind)).fetchone()
+                last_finished, is_open = row
+                if is_open or (last_finished is not None and now - last_finished < interval):
+                    continue
+                enqueue(ticker, kind, due_at=now)
+                queued += 1
+
+    return queued
+
+def claim_job() -> dict | None:
+    """
+    Marks the oldest due pending job as running and returns it, or None if
+    nothing is due. Claiming is atomic, so several schedulers can share a queue.
+    """
+    now = time.time()
+    with etl.transaction() as conn:
+        row = conn.execute("""
+            SELECT id, ticker, kind, attempts FROM scheduler_jobs
+            WHERE status = 'pending' AND due_at <= ?
+            ORDER BY due_at LIMIT 1
+        """, (now,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE scheduler_jobs SET status = 'running', claimed_at = ? WHERE id = ?", (now, row[0]))
+
+    return {"id": row[0], "ticker": row[1], "kind": row[2], "attempts": row[3]}
+
+def run_job(job: dict) -> bool:
+    """
+    Runs a claimed job and records its outcome and duration.
+    A failed job is re-queued with exponential backoff until MAX_ATTEMPTS,
+    after which it is marked failed. Returns True on success.
+    """
+    attempts = job["attempts"] + 1
+    start = time.perf_counter()
+    try:
+        # Extracts raise on provider errors; zero rows written just means nothing new was published
+        written = etl.load_stages(job["ticker"], JOB_STAGES[job["kind"]])
+        rows = sum(written.values())
+        error = None
+    except Exception as e:
+        rows, error = 0, str(e)
+    duration = time.perf_counter() - start
+    now = time.time()
+
+    if error is None:
+        status, due_at = "done", None
+        logger.info(f"{job['kind']} refresh for {job['ticker']}: {rows} rows in {duration:.2f}s")
+    elif attempts < MAX_ATTEMPTS:
+        status, due_at = "pending", now + RETRY_BACKOFF * 2 ** (attempts - 1)
+        logger.warning(f"{job['kind']} refresh for {job['ticker']} failed (attempt {attempts}), retrying in {due_at - now:.0f}s: {error}")
+    else:
+        status, due_at = "failed", None
+        logger.error(f"{job['kind']} refresh for {job['ticker']} failed after {attempts} attempts: {error}")
+
+    etl.get_connection().execute("""
+        UPDATE scheduler_jobs
+        SET status = ?, due_at = COALESCE(?, due_at), attempts = ?, last_error = ?, duration = ?, rows = ?,
+            finished_at = CASE WHEN ? = 'pending' THEN NULL ELSE ? END
+        WHERE id = ?
+    """, (status, due_at, attempts, error, duration, rows, status, now, job["id"]))
+
+    return error is None
+
+def recover_jobs(lease: float = LEASE_TIMEOUT) -> int:
+    """
+    Returns jobs claimed more than `lease` seconds ago and still running, i.e.
+    left behind by a scheduler that died, back to the queue. Jobs claimed by
+    live schedulers sharing the database are left alone.
+    """
+    return etl.get_connection().execute("""
+        UPDATE scheduler_jobs SET status = 'pending', claimed_at = NULL
+        WHERE status = 'running' AND (claimed_at IS NULL OR claimed_at < ?)
+    """, (time.time() - lease,)).rowcount
+
+def prune_jobs(retention: float = JOB_RETENTION) -> int:
+    """
+    Deletes finished jobs older than retention seconds. Returns the number deleted.
+    """
+    return etl.get_connection().execute(
+        "DELETE FROM scheduler_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+        (time.time() - retention,)
+    ).rowcount
+
+def job_status(ticker: str) -> list[dict]:
+    """
+    Returns the most recent job of each kind for a ticker.
+    """
+    rows = etl.get_connection().execute("""
+        SELECT kind, status, due_at, attempts, last_error, duration, finished_at
+        FROM scheduler_jobs
+        WHERE id IN (SELECT MAX(id) FROM scheduler_jobs WHERE ticker = ? GROUP BY kind)
+        ORDER BY kind
+    """, (ticker,)).fetchall()
+    columns = ["kind", "status", "due_at", "attempts", "last_error", "duration", "finished_at"]
+    return [dict(zip(columns, row)) for row in rows]
+
+def run(tickers: list[str] | None = None, once: bool = False, poll_interval: float = POLL_INTERVAL):
+    """
+    Scheduler loop: queues due refreshes for the universe (all stored tickers
+    if None), then works through every due job one at a time.
+    With once=True, returns after the first pass.
+    """
+    prune_jobs()
+    etl.prune_runs()
+    etl.backfill_metrics()
+
+    while True:
+        recover_jobs()
+        universe = tickers if tickers is not None else etl.transform_tickers()
+        schedule_due(universe)
+
+        job = claim_job()
+        while job is not None:
+            run_job(job)
+            job = claim_job()
+
+        if once:
+            return
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refreshes the ticker universe in the background on a fixed cadence.")
+    parser.add_argument("tickers", nargs="*", help="Tickers to keep fresh (default: every ticker in the database)")
+    parser.add_argument("--once", action="store_true", help="Exit once no job is due instead of polling")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    run(args.tickers or None, once=args.once, poll_interval=args.poll_interval)
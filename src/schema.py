@@ -0,0 +1,228 @@
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_TABLES = ["stock_balance_sheets", "stock_income_stmt", "stock_cashflow_stmt"]
+
+def _statement_table(table_name: str) -> str:
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            ticker TEXT,
+            date DATE,
+            position TEXT,
+            entry REAL,
+            row_order INTEGER,
+            PRIMARY KEY (ticker, date, position)
+        )
+    """
+
+# Ordered list of migrations. Migration N (1-based) brings the database to
+# schema version N, which is stored in PRAGMA user_version. Never edit a
+# released migration; append a new one instead.
+MIGRATIONS = [
+    # 1: Base tables (formerly created inline by each loader)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stock_history (
+            ticker TEXT,
+            date DATE,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        )
+        """,
+        *[_statement_table(table_name) for table_name in STATEMENT_TABLES],
+        """
+        CREATE TABLE IF NOT EXISTS stock_peers (
+            ticker TEXT,
+            peer TEXT,
+            PRIMARY KEY (ticker, peer)
+        )
+        """,
+    ],
+    # 2: Secondary indexes. The primary keys already serve (ticker, date) reads;
+    # these cover single-position lookups across dates and reverse peer lookups.
+    [
+        *[f"CREATE INDEX IF NOT EXISTS idx_{table_name}_position ON {table_name} (ticker, position, date)"
+          for table_name in STATEMENT_TABLES],
+        "CREATE INDEX IF NOT EXISTS idx_stock_peers_peer ON stock_peers (peer)",
+    ],
+    # 3: Per-ticker data version, bumped by every write. Read caches compare
+    # against it to detect stale entries, also across processes.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stock_data_version (
+            ticker TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        """,
+    ],
+    # 4: Materialized metrics module outputs, refreshed by the ETL pipeline
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stock_metrics (
+            ticker TEXT,
+            category TEXT,
+            metric TEXT,
+            date DATE,
+            value REAL,
+            row_order INTEGER,
+            PRIMARY KEY (ticker, category, metric, date)
+        )
+        """,
+    ],
+    # 5: LLM sentiment result cache keyed by a hash of model, prompt and headlines
+    [
+        """
+        CREATE TABLE IF NOT EXISTS sentiment_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            score INTEGER,
+            summary TEXT,
+            created_at REAL,
+            last_used_at REAL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache (last_used_at)",
+        """
+        CREATE TABLE IF NOT EXISTS sentiment_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        """,
+    ],
+    # 6: Timestamped sentiment scores from universe-wide batch runs
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stock_sentiment (
+            ticker TEXT,
+            scored_at TEXT,
+            model TEXT,
+            score INTEGER,
+            summary TEXT,
+            headlines INTEGER,
+            attempts INTEGER,
+            duration REAL,
+            error TEXT,
+            PRIMARY KEY (ticker, scored_at)
+        )
+        """,
+    ],
+    # 7: Deduplicated news headlines keyed by a stable article id
+    [
+        """
+        CREATE TABLE IF NOT EXISTS stock_news (
+            ticker TEXT,
+            id TEXT,
+            title TEXT,
+            publisher TEXT,
+            link TEXT,
+            published_at TEXT,
+            fetched_at TEXT,
+            PRIMARY KEY (ticker, id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_stock_news_published ON stock_news (ticker, published_at DESC)",
+    ],
+    # 8: Persistent refresh queue for the background scheduler
+    [
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            due_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            duration REAL,
+            rows INTEGER,
+            created_at REAL NOT NULL,
+            claimed_at REAL,
+            finished_at REAL
+        )
+        """,
+        # At most one open job per ticker and kind, so repeated enqueues are idempotent
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_scheduler_jobs_open ON scheduler_jobs (ticker, kind)
+        WHERE status IN ('pending', 'running')
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_due ON scheduler_jobs (status, due_at)",
+        "CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_finished ON scheduler_jobs (ticker, kind, finished_at)",
+    ],
+    # 9: Per-ticker, per-stage timings and row counts of every ETL run
+    [
+        """
+        CREATE TABLE IF NOT EXISTS etl_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            extract_duration REAL,
+            load_duration REAL,
+            rows_fetched INTEGER,
+            rows_inserted INTEGER,
+            error TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_etl_runs_started ON etl_runs (started_at)",
+        "CREATE INDEX IF NOT EXISTS idx_etl_runs_ticker ON etl_runs (ticker, stage, started_at)",
+        # Daily totals per ticker and stage, for spotting stages that get slower over time
+        """
+        CREATE VIEW IF NOT EXISTS etl_stage_summary AS
+        SELECT
+            date(started_at) AS day,
+            ticker,
+            stage,
+            COUNT(*) AS runs,
+            SUM(COALESCE(extract_duration, 0) + COALESCE(load_duration, 0)) AS total_duration,
+            MAX(COALESCE(extract_duration, 0) + COALESCE(load_duration, 0)) AS max_duration,
+            SUM(extract_duration) AS extract_duration,
+            SUM(load_duration) AS load_duration,
+            SUM(rows_fetched) AS rows_fetched,
+            SUM(rows_inserted) AS rows_inserted,
+            SUM(error IS NOT NULL) AS errors
+        FROM etl_runs
+        GROUP BY day, ticker, stage
+        """,
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Applies all pending migrations in order, each in its own transaction.
+    Expects an autocommit connection (isolation_level=None).
+    Returns the resulting schema version.
+    """
+    version = get_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than supported version {SCHEMA_VERSION}")
+
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Migrating database schema to version {target}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if get_version(conn) >= target:
+                conn.commit()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return get_version(conn)
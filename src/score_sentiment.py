@@ -0,0 +1,35 @@
+import argparse
+import time
+import ai_analysis
+import etl
+
+parser = argparse.ArgumentParser(description="Scores news sentiment for many tickers and stores it in stock_sentiment.")
+parser.add_argument("tickers", nargs="*", help="Tickers to score (default: every ticker in the database)")
+parser.add_argument("--model", default=ai_analysis.DEFAULT_MODEL)
+parser.add_argument("--max-in-flight", type=int, default=ai_analysis.DEFAULT_MAX_IN_FLIGHT)
+parser.add_argument("--timeout", type=float, default=ai_analysis.DEFAULT_TIMEOUT)
+parser.add_argument("--retries", type=int, default=ai_analysis.DEFAULT_RETRIES)
+parser.add_argument("--base-url", default=None, help="Ollama endpoint (default: local Ollama)")
+args = parser.parse_args()
+
+tickers = args.tickers or etl.transform_tickers()
+
+start = time.perf_counter()
+results = ai_analysis.score_universe(
+    tickers,
+    model_name=args.model,
+    max_in_flight=args.max_in_flight,
+    timeout=args.timeout,
+    retries=args.retries,
+    base_url=args.base_url
+)
+elapsed = time.perf_counter() - start
+
+for result in sorted(results, key=lambda r: r["ticker"]):
+    if result["error"]:
+        print(f"{result['ticker']:<12} FAILED  {result['error']}")
+    else:
+        print(f"{result['ticker']:<12} {result['score']:>2}/10   {result['summary']}")
+
+scored = sum(1 for r in results if not r["error"])
+print(f"\nScored {scored}/{len(results)} tickers in {elapsed:.1f}s ({len(results) / elapsed:.2f} tickers/s)")
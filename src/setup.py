@@ -1,3 +1,4 @@
+import os
 import etl
 
 BASE_TICKER = ["NESN.SW", "ROG.SW", "NOVN.SW", "CFR.SW", "ZURN.SW", "UBSG.SW", "PGHN.SW", "SREN.SW", "SLHN.SW"]
@@ -12,7 +13,18 @@ BASE_PEERS = {
             "SREN.SW": ["MUV2.DE", "HNR1.DE", "SCR.PA"],
             "SLHN.SW": ["LGEN.L", "PRU.L", "AGN.AS", "NN.AS"]
             }
+MAX_WORKERS = int(os.environ.get("ETL_MAX_WORKERS", etl.DEFAULT_MAX_WORKERS))
 
-for ticker in BASE_TICKER:
-    etl.load_data(ticker)
-    etl.load_peers(ticker, BASE_PEERS[ticker])
\ No newline at end of file
+report = etl.load_universe(BASE_TICKER, BASE_PEERS, max_workers=MAX_WORKERS)
+
+for ticker, entry in report.items():
+    if entry["status"] == "ok":
+        etl.logger.info(f"{ticker}: ok")
+    else:
+        etl.logger.warning(f"{ticker}: {entry['status']} (missing: {entry['missing']}, errors: {entry['errors']})")
+
+skipped = sum(len(entry["fresh"]) for entry in report.values())
+etl.logger.info(f"{len(report)} unique tickers, {skipped} of {len(report) * len(etl.STAGES)} fetches skipped as still fresh")
+
+slowest = etl.etl_run_summary(by="ticker", days=1, limit=5)
+etl.logger.info(f"Slowest tickers:\n{slowest[['total_duration', 'extract_duration', 'load_duration', 'errors']].round(3)}")
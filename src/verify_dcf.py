@@ -0,0 +1,41 @@
+import time
+import numpy as np
+import pandas as pd
+import dcf
+
+def test_round_trip():
+    fcf = np.array([100.0, 250.0, 40.0])
+    growth = np.array([0.03, 0.12, -0.02])
+    market_cap = dcf.dcf_value(fcf, growth, 0.08, 0.02)
+
+    solved = dcf.implied_growth(market_cap, fcf, 0.08, 0.02)
+    assert np.allclose(solved, growth, atol=1e-9), solved
+    print(f"✅ Implied growth recovers the input growth: {solved}")
+
+def test_invalid_inputs():
+    solved = dcf.implied_growth([1000.0, 1000.0, 1000.0], [-5.0, 50.0, 50.0], [0.08, 0.02, 0.08], [0.02, 0.03, 0.02])
+    assert np.isnan(solved[:2]).all() and not np.isnan(solved[2]), solved
+    print("✅ Negative FCF and r <= g return NaN.")
+
+def test_grid_speed(n_tickers: int = 500):
+    rng = np.random.default_rng(0)
+    inputs = pd.DataFrame({
+        "fcf": rng.uniform(10, 1_000, n_tickers),
+        "market_cap": rng.uniform(500, 50_000, n_tickers)
+    }, index=[f"T{i}" for i in range(n_tickers)])
+    discount_rates = np.arange(0.05, 0.125, 0.005)
+    terminal_growths = np.arange(0.0, 0.0425, 0.0025)
+
+    start = time.perf_counter()
+    grid = dcf.implied_growth_grid(inputs, discount_rates, terminal_growths)
+    elapsed = time.perf_counter() - start
+
+    assert grid.shape == (n_tickers, len(discount_rates), len(terminal_growths))
+    print(f"Solved {grid.size:,} scenarios in {elapsed * 1000:.0f} ms")
+    assert elapsed < 1.0
+    print("✅ Full grid solved well under a second.")
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_invalid_inputs()
+    test_grid_speed()
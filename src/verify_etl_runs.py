@@ -0,0 +1,75 @@
+import os
+import tempfile
+import etl
+import providers
+
+class UnevenProvider(providers.FixtureProvider):
+    """
+    Fixture provider where one ticker is slow and another's balance sheet fails.
+    """
+    slow, broken = "SLOW", "BROKEN"
+
+    def history(self, ticker, start=None):
+        if ticker == self.slow:
+            self.latency = 0.3
+        try:
+            return super().history(ticker, start)
+        finally:
+            self.latency = 0.0
+
+    def balance_sheet(self, ticker):
+        if ticker == self.broken:
+            raise providers.ProviderError("simulated outage")
+        return super().balance_sheet(ticker)
+
+def runs(where: str = "1 = 1", params: tuple = ()) -> list[tuple]:
+    return etl.get_connection().execute(f"""
+        SELECT ticker, stage, extract_duration, load_duration, rows_fetched, rows_inserted, error
+        FROM etl_runs WHERE {where} ORDER BY id
+    """, params).fetchall()
+
+def test_universe_ledger():
+    report = etl.load_universe(["FAST", "SLOW", "BROKEN"], max_workers=1)
+    assert report["BROKEN"]["status"] == "partial", report
+
+    recorded = {(ticker, stage) for ticker, stage, *_ in runs()}
+    for ticker in ("FAST", "SLOW", "BROKEN"):
+        for stage in list(etl.STAGES) + ["metrics", "commit"]:
+            assert (ticker, stage) in recorded, (ticker, stage)
+
+    error = runs("ticker = 'BROKEN' AND stage = 'balance_sheet'")[0][-1]
+    assert error and "simulated outage" in error, error
+    history = runs("ticker = 'FAST' AND stage = 'history'")[0]
+    assert history[4] == history[5] > 0 and history[2] > 0 and history[3] > 0, history
+    print("✅ Every ticker and stage recorded with durations, row counts and errors.")
+
+def test_fetched_vs_inserted():
+    version = etl.data_version("FAST")
+    etl.load_stages("FAST", ["history"] + etl.STATEMENT_STAGES)
+    # Everything was already stored, so everything fetched is skipped
+    for stage in ("history", "income_stmt"):
+        latest = runs("ticker = 'FAST' AND stage = ?", (stage,))[-1]
+        assert latest[4] > 0 and latest[5] == 0, latest
+        print(f"✅ Re-fetched {stage}: {latest[4]} fetched, {latest[5]} inserted.")
+    assert etl.data_version("FAST") == version # Cached transforms stay valid
+    commits = runs("ticker = 'FAST' AND stage = 'commit'")
+    assert commits and commits[-1][3] is not None, commits
+
+def test_summary():
+    by_ticker = etl.etl_run_summary(by="ticker")
+    assert by_ticker.index[0] == "SLOW", by_ticker
+    by_stage = etl.etl_run_summary(by="stage")
+    assert by_stage.index[0] == "history", by_stage
+    daily = etl.get_connection().execute("SELECT COUNT(*) FROM etl_stage_summary").fetchone()[0]
+    assert daily > 0
+    print(f"✅ Summary ranks the slowest ticker ({by_ticker.index[0]}) and stage ({by_stage.index[0]}) first.")
+    print(by_ticker[["runs", "total_duration", "rows_fetched", "rows_inserted", "errors"]])
+
+if __name__ == "__main__":
+    etl.provider = UnevenProvider(path=None, years=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "runs.db")
+        test_universe_ledger()
+        test_fetched_vs_inserted()
+        test_summary()
+        etl.close_connections()
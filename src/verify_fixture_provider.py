@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+import pandas as pd
+import dcf
+import etl
+import metrics
+import providers
+
+TICKERS = [f"FX{i:02d}" for i in range(10)]
+
+def test_deterministic():
+    first = providers.FixtureProvider(path=None, end="2024-12-31")
+    second = providers.FixtureProvider(path=None, end="2024-12-31")
+    pd.testing.assert_frame_equal(first.history("AAA"), second.history("AAA"))
+    pd.testing.assert_frame_equal(first.income_stmt("AAA"), second.income_stmt("AAA"))
+    assert not first.history("AAA")["Close"].equals(first.history("BBB")["Close"])
+
+    bars = first.history("AAA")
+    assert (bars["Low"] <= bars[["Open", "Close"]].min(axis=1)).all()
+    assert (bars["High"] >= bars[["Open", "Close"]].max(axis=1)).all()
+
+    recent = first.history("AAA", start="2024-12-01")
+    assert recent.index.min() >= pd.Timestamp("2024-12-01") and len(recent) == 22, recent.index
+    print("✅ Synthetic data is deterministic per ticker, forms valid candles and honours the start date.")
+
+def test_fixture_files():
+    synthetic = providers.FixtureProvider(path=None, years=2, end="2024-12-31")
+    with tempfile.TemporaryDirectory() as tmp:
+        providers.write_fixtures(synthetic, ["AAA"], tmp)
+        replay = providers.FixtureProvider(path=tmp)
+        pd.testing.assert_frame_equal(replay.history("AAA"), synthetic.history("AAA"), check_freq=False)
+        pd.testing.assert_frame_equal(replay.cashflow("AAA"), synthetic.cashflow("AAA"), check_freq=False)
+        assert replay.news("AAA") == synthetic.news("AAA")
+    print("✅ Fixture files written by write_fixtures replay identically.")
+
+def test_csv_fixture_across_dst():
+    # yfinance-style export in exchange time, crossing the March 2024 DST change
+    synthetic = providers.FixtureProvider(path=None, years=1, end="2024-04-30")
+    history = synthetic.history("ZRH", start="2024-03-01")
+    exported = history.tz_localize("Europe/Zurich")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "ZRH"))
+        exported.reset_index().to_csv(os.path.join(tmp, "ZRH", "history.csv"), index=False)
+        replay = providers.FixtureProvider(path=tmp)
+        pd.testing.assert_frame_equal(replay.history("ZRH"), history, check_freq=False)
+        assert len(replay.history("ZRH", start="2024-04-01")) == len(history.loc["2024-04-01":])
+    print("✅ CSV fixtures with mixed DST offsets replay on their local dates.")
+
+def test_offline_universe():
+    etl.provider = providers.get_provider("fixture", path=None, years=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "fixture.db")
+        start = time.perf_counter()
+        report = etl.load_universe(TICKERS)
+        elapsed = time.perf_counter() - start
+        assert all(entry["status"] == "ok" for entry in report.values()), report
+
+        assert len(etl.transform_history(TICKERS[0], days=-1)) == 5 * 261
+        assert not etl.transform_financial_statement(TICKERS[0], "income_stmt").empty
+        valuation = metrics.calculate_peer_valuation(TICKERS)
+        assert valuation.notna().all().all(), valuation
+        inputs = dcf.load_dcf_inputs(TICKERS)
+        assert (inputs["fcf"] > 0).all() and (inputs["market_cap"] > 0).all(), inputs
+        etl.close_connections()
+
+    print(f"✅ Offline ETL of {len(TICKERS)} tickers in {elapsed:.2f}s, metrics and DCF inputs complete.")
+
+if __name__ == "__main__":
+    test_deterministic()
+    test_fixture_files()
+    test_csv_fixture_across_dst()
+    test_offline_universe()
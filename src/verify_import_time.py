@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+# Modules the dashboard must not load until sentiment analysis or a fetch is requested
+DEFERRED_MODULES = ["yfinance", "langchain_core", "langchain_ollama", "ollama", "curl_cffi"]
+# Cumulative import time of app.py; override with IMPORT_BUDGET_MS on slower machines
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 2000))
+RUNS = 3
+
+def import_times(module: str) -> dict[str, float]:
+    """
+    Imports a module in a fresh interpreter with -X importtime and returns
+    the cumulative import time (ms) of every module it loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+def test_heavy_modules_are_deferred():
+    loaded = import_times("app")
+    eager = [m for m in DEFERRED_MODULES if m in loaded]
+    assert not eager, f"app imports {eager} at startup"
+    print(f"✅ app does not import {', '.join(DEFERRED_MODULES)} at startup.")
+
+def test_cold_start_budget():
+    # Best of several runs, so a busy machine does not fail the check by itself
+    best = min(import_times("app")["app"] for _ in range(RUNS))
+    assert best < IMPORT_BUDGET_MS, f"import app took {best:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+    print(f"✅ import app: {best:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms).")
+
+def test_deferred_modules_still_load():
+    loaded = import_times("ai_analysis; ai_analysis._get_chain('llama3.1')")
+    assert "langchain_ollama" in loaded
+    loaded = import_times("etl; etl.provider.client")
+    assert "yfinance" in loaded
+    print("✅ LangChain and yfinance load on first use.")
+
+if __name__ == "__main__":
+    test_heavy_modules_are_deferred()
+    test_cold_start_budget()
+    test_deferred_modules_still_load()
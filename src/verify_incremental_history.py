@@ -0,0 +1,66 @@
+import os
+import tempfile
+import etl
+import price_store
+import providers
+
+TICKER = "SPLT"
+
+class AdjustingProvider(providers.FixtureProvider):
+    """
+    Fixture provider that records history requests and can re-adjust its prices
+    like yfinance does after a split (`factor`) or revise only the latest bar.
+    """
+    factor = 1.0
+    latest_bump = 0.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = []
+
+    def history(self, ticker, start=None):
+        self.requests.append(start)
+        history = super().history(ticker, start)
+        history[["Open", "High", "Low", "Close"]] *= self.factor
+        history.iloc[-1, history.columns.get_loc("Close")] *= 1 + self.latest_bump
+        return history
+
+def stored_closes():
+    return etl.transform_history(TICKER, days=-1)["close"]
+
+def test_incremental_refresh():
+    etl.load_stages(TICKER, ["history"])
+    before = stored_closes()
+    assert etl.provider.requests == [None], etl.provider.requests
+
+    etl.provider.latest_bump = 0.01 # Intraday snapshot of the latest bar was revised
+    etl.load_stages(TICKER, ["history"])
+    assert etl.provider.requests[-1] is not None, etl.provider.requests
+    assert stored_closes().iloc[:-1].equals(before.iloc[:-1])
+    print(f"✅ Unchanged history is refreshed incrementally ({backend()}).")
+
+def test_split_triggers_full_refresh():
+    before = stored_closes()
+    etl.provider.requests.clear()
+    etl.provider.factor, etl.provider.latest_bump = 0.5, 0.0 # 2:1 split re-adjusts every past bar
+    etl.load_stages(TICKER, ["history"])
+
+    assert len(etl.provider.requests) == 2 and etl.provider.requests[-1] is None, etl.provider.requests
+    after = stored_closes()
+    # The latest bar was revised by the previous test, every other one is simply halved
+    assert len(after) == len(before) and ((after / before - 0.5).abs() < 1e-9).iloc[:-1].all()
+    print(f"✅ A re-adjusted overlap window replaces the whole history ({backend()}).")
+
+def backend() -> str:
+    return etl.PRICE_BACKEND
+
+if __name__ == "__main__":
+    for etl.PRICE_BACKEND in ("sqlite", "parquet"):
+        etl.provider = AdjustingProvider(path=None, years=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            etl.DB_NAME = os.path.join(tmp, "history.db")
+            price_store.PARQUET_DIR = os.path.join(tmp, "prices")
+            etl.clear_cache()
+            test_incremental_refresh()
+            test_split_triggers_full_refresh()
+            etl.close_connections()
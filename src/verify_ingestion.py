@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import etl
+import providers
+
+LATENCY = 0.2 # Simulated network round-trip per request (seconds)
+TICKERS = [f"T{i:02d}" for i in range(12)]
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def test_concurrent_ingestion():
+    etl.provider = providers.FixtureProvider(path=None, years=1, latency=LATENCY)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "sequential.db")
+        _, sequential = timed(lambda: [etl.load_data(t) for t in TICKERS])
+
+        etl.DB_NAME = os.path.join(tmp, "concurrent.db")
+        report, concurrent = timed(lambda: etl.load_universe(TICKERS, max_workers=8))
+
+        print(f"Sequential: {sequential:.2f}s, concurrent: {concurrent:.2f}s ({sequential / concurrent:.1f}x)")
+        assert all(entry["status"] == "ok" for entry in report.values()), report
+
+        rows = len(etl.transform_history(TICKERS[0], days=-1))
+        assert rows == 261, rows
+        headlines = [n["title"] for n in etl.transform_news(TICKERS[0], limit=2)]
+        assert headlines == [f"{TICKERS[0]} fixture headline 1", f"{TICKERS[0]} fixture headline 2"], headlines
+        assert concurrent < sequential
+
+    print("✅ Concurrent ingestion loaded every ticker.")
+
+def test_writers_not_blocked_during_fetch():
+    etl.provider = providers.FixtureProvider(path=None, years=1, latency=LATENCY)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "locks.db")
+        etl.get_connection()
+        loader = threading.Thread(target=etl.load_universe, args=(TICKERS,), kwargs={"max_workers": 4})
+        loader.start()
+        time.sleep(LATENCY / 2)
+
+        # Another writer (e.g. REFRESH DATA queueing a job) only waits for a single ticker's commit
+        conn = sqlite3.connect(etl.DB_NAME, timeout=LATENCY, isolation_level=None)
+        for _ in range(5):
+            assert loader.is_alive(), "fetches finished before the writer ran"
+            conn.execute("INSERT INTO scheduler_jobs (ticker, kind, due_at, created_at) VALUES ('X', 'prices', 0, 0)")
+            conn.execute("DELETE FROM scheduler_jobs WHERE ticker = 'X'")
+            time.sleep(LATENCY)
+        conn.close()
+        loader.join()
+
+    print("✅ Other writers proceed while extracts are in flight.")
+
+def test_failed_commit_rolls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "commit.db")
+        conn = etl.get_connection()
+        # A deferred foreign key is only checked at COMMIT, so the commit itself fails
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("CREATE TEMP TABLE parent (id INTEGER PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE child (parent_id INTEGER REFERENCES parent (id) DEFERRABLE INITIALLY DEFERRED)")
+        try:
+            with etl.transaction():
+                conn.execute("INSERT INTO child VALUES (1)")
+            raise AssertionError("commit of an orphaned row succeeded")
+        except sqlite3.IntegrityError:
+            pass
+
+        # The thread's connection is usable again instead of stuck mid-transaction
+        assert not conn.in_transaction and etl._local.transaction_depth == 0
+        with etl.transaction():
+            conn.execute("INSERT INTO parent VALUES (1)")
+        assert conn.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM parent").fetchone()[0] == 1
+        etl.close_connections()
+
+    print("✅ A failed commit is rolled back and later transactions still work.")
+
+if __name__ == "__main__":
+    test_concurrent_ingestion()
+    test_writers_not_blocked_during_fetch()
+    test_failed_commit_rolls_back()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from streamlit.testing.v1 import AppTest
+import etl
+import providers
+
+TICKERS = ["UBSG.SW", "MS"]
+PEERS = {"UBSG.SW": ["MS", "JPM", "BAC"], "MS": ["UBSG.SW", "JPM", "BAC"]}
+EXPENSIVE = ["FINANCIAL STATEMENTS", "METRICS", "REVERSE DCF", "INTELLIGENCE"]
+
+def rendered_tabs(at: AppTest) -> set[str]:
+    sections = at.sidebar.dataframe[0].value.index
+    return {name.split(" / ")[0] for name in sections}
+
+def test_only_selected_tab_renders():
+    at = AppTest.from_file("app.py", default_timeout=60).run()
+    assert not at.exception, at.exception
+    assert not rendered_tabs(at) & set(EXPENSIVE), rendered_tabs(at)
+    print(f"✅ Default rerun only renders MARKET DATA: {sorted(rendered_tabs(at))}")
+
+    for tab in EXPENSIVE:
+        at.session_state["main_tab"] = tab
+        at.run()
+        assert not at.exception, at.exception
+        assert rendered_tabs(at) & {"MARKET DATA", *EXPENSIVE} == {tab}, (tab, rendered_tabs(at))
+    print("✅ Every tab renders on its own when selected.")
+
+def test_nested_tabs_are_lazy():
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.session_state["main_tab"] = "METRICS"
+    sections = at.run().sidebar.dataframe[0].value
+    assert "METRICS / margins & ratios" in sections.index and "METRICS / peers" not in sections.index, list(sections.index)
+
+    at.session_state["metrics_tab"] = "Peers"
+    sections = at.run().sidebar.dataframe[0].value
+    assert "METRICS / peers" in sections.index and "METRICS / margins & ratios" not in sections.index, list(sections.index)
+    print("✅ Peer comparison only runs when its sub-tab is selected.")
+
+def test_ticker_switch_cost():
+    at = AppTest.from_file("app.py", default_timeout=60).run()
+    at.sidebar.text_input[0].set_value(TICKERS[1]).run()
+    assert not at.exception, at.exception
+    sections = at.sidebar.dataframe[0].value
+    queries = sections.loc[["history", "MARKET DATA"], "queries"].sum()
+    # History and chart bars, each one metadata lookup plus one read
+    assert queries <= 4, sections
+    print(f"✅ Switching to {TICKERS[1]} issues {queries} dashboard queries.")
+
+def test_dcf_inputs_survive_tab_switch():
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.session_state["main_tab"] = "REVERSE DCF"
+    at.run()
+    at.slider(key="dcf_years").set_value(12).run()
+
+    at.session_state["main_tab"] = "MARKET DATA"
+    at.run()
+    at.session_state["main_tab"] = "REVERSE DCF"
+    at.run()
+    assert at.slider(key="dcf_years").value == 12
+    print("✅ DCF assumptions are kept while another tab is open.")
+
+if __name__ == "__main__":
+    os.environ["DEBUG_PERF"] = "1"
+    etl.provider = providers.FixtureProvider(path=None, years=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "lazy_tabs.db")
+        etl.load_universe(TICKERS, PEERS)
+        test_only_selected_tab_renders()
+        test_nested_tabs_are_lazy()
+        test_ticker_switch_cost()
+        test_dcf_inputs_survive_tab_switch()
+        etl.close_connections()
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import etl
+
+YEARS = 30
+TICKERS = [f"SYN{i}" for i in range(10)]
+
+def synthetic_history(years: int = YEARS, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-12-31", periods=years * 261, tz="Europe/Zurich", name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    return pd.DataFrame({
+        "Open": close * 0.995,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, len(dates))
+    }, index=dates).reset_index()
+
+def synthetic_statement(years: int = YEARS, positions: int = 60) -> pd.DataFrame:
+    dates = pd.to_datetime([f"{2024 - i}-12-31" for i in range(years)])
+    values = np.arange(positions * years, dtype=float).reshape(positions, years)
+    return pd.DataFrame(values, index=[f"Position{i}" for i in range(positions)], columns=dates)
+
+def legacy_load_history(ticker: str, history: pd.DataFrame):
+    """
+    The former iterrows-based loader, kept here as the benchmark baseline.
+    """
+    conn = sqlite3.connect(etl.DB_NAME)
+    data_to_insert = []
+    for _, row in history.iterrows():
+        data_to_insert.append((
+            ticker,
+            row['Date'].strftime('%Y-%m-%d'),
+            row['Open'],
+            row['High'],
+            row['Low'],
+            row['Close'],
+            row['Volume']
+        ))
+    conn.executemany("""
+        INSERT OR REPLACE INTO stock_history (ticker, date, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, data_to_insert)
+    conn.commit()
+    conn.close()
+
+def legacy_load_statement(ticker: str, statement: pd.DataFrame):
+    conn = sqlite3.connect(etl.DB_NAME)
+    data_to_insert = []
+    for i, (position, row) in enumerate(statement.iterrows()):
+        for date, entry in row.items():
+            data_to_insert.append((ticker, date.strftime('%Y-%m-%d'), position, entry, i))
+    conn.executemany("""
+        INSERT OR IGNORE INTO stock_income_stmt (ticker, date, position, entry, row_order)
+        VALUES (?, ?, ?, ?, ?)
+    """, data_to_insert)
+    conn.commit()
+    conn.close()
+
+def rows_per_second(loader, frame, rows) -> float:
+    start = time.perf_counter()
+    for ticker in TICKERS:
+        loader(ticker, frame)
+    return rows * len(TICKERS) / (time.perf_counter() - start)
+
+def dump(table: str) -> list:
+    conn = sqlite3.connect(etl.DB_NAME)
+    rows = conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+    conn.close()
+    return rows
+
+def test_load_speed():
+    history = synthetic_history()
+    statement = synthetic_statement()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, load_history, load_statement in [
+            ("before", legacy_load_history, legacy_load_statement),
+            ("after", etl.load_history, etl.load_income_stmt),
+        ]:
+            etl.DB_NAME = os.path.join(tmp, f"{label}.db")
+            # Create the tables so both variants only measure the insert path
+            etl.load_history("WARMUP", history.head(1))
+            etl.load_income_stmt("WARMUP", statement.iloc[:1, :1])
+            results[label] = (
+                rows_per_second(load_history, history, len(history)),
+                rows_per_second(load_statement, statement, statement.size),
+                dump("stock_history"),
+                dump("stock_income_stmt")
+            )
+
+    print(f"History:    {results['before'][0]:>10,.0f} -> {results['after'][0]:>10,.0f} rows/sec")
+    print(f"Statements: {results['before'][1]:>10,.0f} -> {results['after'][1]:>10,.0f} rows/sec")
+
+    assert results["before"][2] == results["after"][2], "History rows differ"
+    assert results["before"][3] == results["after"][3], "Statement rows differ"
+    print("✅ Vectorized loaders store identical rows.")
+
+if __name__ == "__main__":
+    test_load_speed()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+import etl
+import providers
+
+TICKER = "UBSG.SW"
+BARE = "BARE" # A single income statement line, from which no metric can be derived
+NO_REVENUE = "NOREV" # Income statements without revenue: growth metrics only, no margins
+
+def test_backfill():
+    etl.load_universe([TICKER])
+    stored = etl.transform_metrics(TICKER, "margins")
+    etl.get_connection().execute("DELETE FROM stock_metrics")
+    etl.clear_cache()
+
+    assert etl.backfill_metrics() == 1
+    assert etl.transform_metrics(TICKER, "margins").equals(stored)
+    print("✅ Tickers loaded before metrics were materialized are backfilled.")
+
+def test_empty_metrics_keep_cache():
+    etl.load_income_stmt(BARE, pd.DataFrame({pd.Timestamp("2024-12-31"): [1.0]}, index=["OtherGandA"]))
+    assert etl.load_metrics(BARE) == 0
+    version = etl.data_version(BARE)
+
+    etl.load_metrics(BARE)
+    etl.backfill_metrics()
+    assert etl.data_version(BARE) == version, (etl.data_version(BARE), version)
+    print("✅ Recomputing metrics that stay empty does not invalidate cached transforms.")
+
+def test_metrics_tab_does_not_write():
+    dates = pd.to_datetime(["2024-12-31", "2023-12-31"])
+    etl.load_history(NO_REVENUE, etl.provider.history(TICKER).reset_index())
+    etl.load_income_stmt(NO_REVENUE, pd.DataFrame({d: [1.0] for d in dates}, index=["OtherGandA"]))
+    etl.load_metrics(NO_REVENUE)
+    assert etl.transform_metrics(NO_REVENUE, "margins").empty
+    version = etl.data_version(NO_REVENUE)
+
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.session_state["main_tab"] = "METRICS"
+    at.run()
+    at.sidebar.text_input[0].set_value(NO_REVENUE)
+    for _ in range(3):
+        at.run()
+        assert not at.exception, at.exception
+    assert etl.data_version(NO_REVENUE) == version, (etl.data_version(NO_REVENUE), version)
+    print("✅ Rendering METRICS never rewrites stock_metrics.")
+
+if __name__ == "__main__":
+    etl.provider = providers.FixtureProvider(path=None, years=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "metrics_backfill.db")
+        test_backfill()
+        test_empty_metrics_keep_cache()
+        test_metrics_tab_does_not_write()
+        etl.close_connections()
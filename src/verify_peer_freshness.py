@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+from collections import Counter
+import etl
+import providers
+
+# Overlapping peer lists, as in setup.py
+TICKERS = ["ROG.SW", "NOVN.SW"]
+PEERS = {
+    "ROG.SW": ["NOVN.SW", "PFE", "LLY", "NOVO-B.CO", "JNJ"],
+    "NOVN.SW": ["ROG.SW", "PFE", "LLY", "NOVO-B.CO", "JNJ"],
+}
+
+class CountingProvider(providers.FixtureProvider):
+    """
+    Fixture provider counting every (ticker, statement) request.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, ticker, what):
+        with self._lock:
+            self.calls[(ticker, what)] += 1
+
+    def history(self, ticker, start=None):
+        self._count(ticker, "history")
+        return super().history(ticker, start)
+
+    def balance_sheet(self, ticker):
+        self._count(ticker, "balance_sheet")
+        return super().balance_sheet(ticker)
+
+    def income_stmt(self, ticker):
+        self._count(ticker, "income_stmt")
+        return super().income_stmt(ticker)
+
+    def cashflow(self, ticker):
+        self._count(ticker, "cashflow")
+        return super().cashflow(ticker)
+
+    def news(self, ticker):
+        self._count(ticker, "news")
+        return super().news(ticker)
+
+def test_peer_graph_is_deduplicated():
+    report = etl.load_universe(TICKERS, PEERS)
+    unique = set(TICKERS) | {peer for peers in PEERS.values() for peer in peers}
+    assert set(report) == unique and all(entry["status"] == "ok" for entry in report.values()), report
+    assert max(etl.provider.calls.values()) == 1 and len(etl.provider.calls) == len(unique) * len(etl.STAGES)
+    assert sorted(etl.transform_peers("ROG.SW")) == sorted(PEERS["ROG.SW"])
+    print(f"✅ {len(unique)} unique tickers fetched once each ({sum(map(len, PEERS.values())) + len(TICKERS)} requested).")
+
+def test_fresh_stages_are_skipped():
+    etl.provider.calls.clear()
+    report = etl.load_universe(TICKERS, PEERS)
+    assert not etl.provider.calls, etl.provider.calls
+    assert all(sorted(entry["fresh"]) == sorted(etl.STAGES) and entry["status"] == "ok" for entry in report.values()), report
+
+    report = etl.load_peers("ROG.SW", PEERS["ROG.SW"])
+    assert not etl.provider.calls and all(entry["fresh"] for entry in report.values())
+    print(f"✅ Second load skipped all {len(report) * len(etl.STAGES)} peer fetches.")
+
+def test_ttl_per_stage():
+    etl.provider.calls.clear()
+    report = etl.load_universe(TICKERS, PEERS, ttl={"history": 0})
+    assert {what for _, what in etl.provider.calls} == {"history"}, etl.provider.calls
+    assert all("history" not in entry["fresh"] for entry in report.values())
+    print("✅ A zero TTL forces only its own stage.")
+
+    # Age the ledger past the news TTL but not the statement TTL
+    etl.get_connection().execute("""
+        UPDATE etl_runs SET started_at = datetime(started_at, '-2 hours') WHERE stage = 'news'
+    """)
+    etl.provider.calls.clear()
+    etl.load_universe(TICKERS, PEERS)
+    assert {what for _, what in etl.provider.calls} == {"news"}, etl.provider.calls
+    print("✅ Stages are refetched once their TTL has expired.")
+
+def test_failed_fetches_are_retried():
+    etl.get_connection().execute("DELETE FROM etl_runs WHERE ticker = 'PFE' AND stage = 'balance_sheet'")
+    etl.get_connection().execute("""
+        INSERT INTO etl_runs (run_id, ticker, stage, started_at, extract_duration, error)
+        VALUES ('failed', 'PFE', 'balance_sheet', datetime('now', 'localtime'), 0.1, 'extract: simulated outage')
+    """)
+    etl.provider.calls.clear()
+    etl.load_universe(["PFE"])
+    assert list(etl.provider.calls) == [("PFE", "balance_sheet")], etl.provider.calls
+    print("✅ Stages whose last fetch failed are not considered fresh.")
+
+if __name__ == "__main__":
+    etl.provider = CountingProvider(path=None, years=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "peer_freshness.db")
+        test_peer_graph_is_deduplicated()
+        test_fresh_stages_are_skipped()
+        test_ttl_per_stage()
+        test_failed_fetches_are_retried()
+        etl.close_connections()
@@ -1,6 +1,11 @@
+import os
+import tempfile
 import etl
 import metrics
 import pandas as pd
+import providers
+
+PEERS = ["MS", "JPM", "BAC"]
 
 def test_peer_retrieval():
     ticker = "UBSG.SW"
@@ -15,14 +20,59 @@ def test_peer_metrics():
     peers = etl.transform_peers(ticker)
     comparison_tickers = [ticker] + peers
     
+    valuation = metrics.calculate_peer_valuation(comparison_tickers)
+    print(valuation)
+    assert list(valuation.index) == comparison_tickers
+    
     for t in comparison_tickers:
         pe = metrics.calculate_pe(t)
-        pb = metrics.calculate_pb(t)
-        print(f"{t} - PE: {pe.iloc[0] if not pe.empty else 'N/A'}, PB: {pb.iloc[0] if not pb.empty else 'N/A'}")
+        if not pe.empty and pd.notnull(pe.iloc[0]):
+            assert abs(pe.iloc[0] - valuation.loc[t, "P/E Ratio"]) < 1e-9
+
+def test_peers_without_statements():
+    # Priced tickers without any statement: no fundamentals to join at all
+    etl.load_history("NOSTMT", etl.provider.history("NOSTMT").reset_index())
+    valuation = metrics.calculate_peer_valuation(["NOSTMT"])
+    assert list(valuation.index) == ["NOSTMT"] and valuation.isna().all().all(), valuation
+
+    valuation = metrics.calculate_peer_valuation(["UBSG.SW", "NOSTMT"])
+    assert valuation.loc["NOSTMT"].isna().all() and valuation.loc["UBSG.SW"].notna().all(), valuation
+    print(valuation)
+
+def test_null_latest_eps():
+    # The newest filing reports no EPS: both paths fall back to the previous
+    # year's EPS at today's price instead of an old ratio or NaN
+    ticker = "UBSG.SW"
+    with etl.transaction() as conn:
+        latest = conn.execute(
+            "SELECT MAX(date) FROM stock_income_stmt WHERE ticker = ? AND position = 'DilutedEPS'", (ticker,)
+        ).fetchone()[0]
+        conn.execute(
+            "UPDATE stock_income_stmt SET entry = NULL WHERE ticker = ? AND position = 'DilutedEPS' AND date = ?",
+            (ticker, latest)
+        )
+        etl._bump_data_version(conn, ticker)
+
+    eps = etl.transform_positions([ticker], "income_stmt", ["DilutedEPS"]).dropna()["entry"].iloc[-1]
+    close = etl.transform_latest_prices([ticker]).loc[ticker, "close"]
+    pe = metrics.calculate_pe(ticker).iloc[0]
+    peer_pe = metrics.calculate_peer_valuation([ticker]).loc[ticker, "P/E Ratio"]
+    assert abs(pe - close / eps) < 1e-9 and abs(pe - peer_pe) < 1e-9, (pe, peer_pe, close / eps)
+    assert abs(metrics.calculate_valuation_series(ticker)["P/E Ratio"].iloc[-1] - pe) < 1e-9
+    print(f"✅ A NULL latest EPS falls back to the previous filing in every path (P/E {pe:.2f}).")
 
 if __name__ == "__main__":
-    print("Testing peer retrieval...")
-    test_peer_retrieval()
-    print("\nTesting peer metrics...")
-    test_peer_metrics()
+    etl.provider = providers.FixtureProvider(path=None, years=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "peers.db")
+        etl.load_universe(["UBSG.SW"], {"UBSG.SW": PEERS})
+        print("Testing peer retrieval...")
+        test_peer_retrieval()
+        print("\nTesting peer metrics...")
+        test_peer_metrics()
+        print("\nTesting peers without statements...")
+        test_peers_without_statements()
+        print("\nTesting a NULL latest EPS...")
+        test_null_latest_eps()
+        etl.close_connections()
     print("\nVerification complete.")
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from streamlit.testing.v1 import AppTest
+import etl
+import perf
+import providers
+
+TICKER = "UBSG.SW"
+PEERS = ["MS", "JPM", "BAC"]
+
+def test_profiler_counts():
+    profiler = perf.RenderProfiler()
+    with profiler.run():
+        with profiler.section("outer"):
+            with profiler.section("inner"):
+                etl.clear_cache()
+                rows = len(etl.transform_history(TICKER, days=-1))
+            etl.transform_history(TICKER, days=-1)
+
+    summary = profiler.summary()
+    assert list(summary.index) == ["outer", "outer / inner"], summary
+    assert summary.loc["outer / inner", "queries"] > 0 and summary.loc["outer / inner", "rows"] == rows
+    # The second call is served from the transform cache: rows are counted, no history query is issued
+    assert summary.loc["outer", "rows"] == 2 * rows
+    assert profiler.transform_summary().loc["transform_history", "cache hits"] == 1
+    print(f"✅ Profiler attributes queries and rows to nested sections:\n{summary}")
+
+def test_disabled_profiler_is_inert():
+    profiler = perf.RenderProfiler(enabled=False)
+    with profiler.run(), profiler.section("anything"):
+        etl.transform_history(TICKER, days=-1)
+    assert profiler.summary().empty and profiler.totals()["queries"] == 0
+    print("✅ Disabled profiler records nothing.")
+
+def test_dashboard_panel():
+    os.environ["DEBUG_PERF"] = "1"
+    at = AppTest.from_file("app.py", default_timeout=60).run()
+    assert not at.exception, at.exception
+
+    sections = at.sidebar.dataframe[0].value
+    for name in ["history", "MARKET DATA / chart data", "MARKET DATA / range masks", "MARKET DATA / candlestick build"]:
+        assert name in sections.index, (name, list(sections.index))
+    assert sections["queries"].sum() > 0 and sections.loc["history", "rows"] > 0
+    print(f"✅ Dashboard shows the breakdown:\n{sections}")
+
+    at.session_state["main_tab"] = "REVERSE DCF"
+    sections = at.run().sidebar.dataframe[0].value
+    assert "REVERSE DCF / inputs" in sections.index, list(sections.index)
+    print("✅ Sections follow the selected tab.")
+
+    os.environ["DEBUG_PERF"] = "0"
+    at = AppTest.from_file("app.py", default_timeout=60).run()
+    assert not at.exception and len(at.sidebar.dataframe) == 0
+    print("✅ Panel is hidden unless enabled.")
+
+if __name__ == "__main__":
+    etl.provider = providers.FixtureProvider(path=None, years=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "perf.db")
+        etl.load_universe([TICKER], {TICKER: PEERS})
+        test_profiler_counts()
+        test_disabled_profiler_is_inert()
+        test_dashboard_panel()
+        etl.close_connections()
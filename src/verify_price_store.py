@@ -0,0 +1,66 @@
+import os
+import tempfile
+import pandas as pd
+import etl
+import price_store
+import providers
+
+TICKER = "PQT"
+
+def bars(dates: pd.DatetimeIndex, close: float) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": dates, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1000
+    })
+
+def test_round_trip():
+    dates = pd.date_range("2024-01-01", periods=10, freq="B")
+    assert price_store.write_history("RT", bars(dates, 10.0)) == 10
+
+    stored = price_store.read_history("RT")
+    assert list(stored.index) == list(dates) and (stored["close"] == 10.0).all(), stored
+    assert stored.index.dtype.kind == "M" # Typed dates, no string parsing
+    assert price_store.latest_date("RT") == dates[-1].strftime('%Y-%m-%d')
+    assert len(price_store.read_history("RT", start=dates[5])) == 5
+    assert price_store.read_history("MISSING").empty and price_store.latest_date("MISSING") is None
+    print("✅ Bars read back exactly as written.")
+
+def test_incremental_merge():
+    # Overlaps the last 5 stored bars with revised values and adds 5 new ones
+    dates = pd.date_range("2024-01-01", periods=15, freq="B")
+    assert price_store.write_history("RT", bars(dates[5:], 20.0)) == 10 # 5 revised, 5 new
+    assert price_store.write_history("RT", bars(dates[10:], 20.0)) == 0 # Unchanged, not rewritten
+
+    stored = price_store.read_history("RT")
+    assert list(stored.index) == list(dates), stored.index # No duplicate dates
+    assert (stored["close"].iloc[:5] == 10.0).all() and (stored["close"].iloc[5:] == 20.0).all(), stored
+    assert not os.path.exists(price_store._partition_path("RT") + ".tmp")
+    print("✅ Incremental writes merge into the partition, newer values win and only changes are counted.")
+
+def load_backend(backend: str) -> dict[str, pd.DataFrame]:
+    etl.PRICE_BACKEND = backend
+    etl.clear_cache()
+    etl.load_stages(TICKER, ["history"])
+    return {
+        "history": etl.transform_history(TICKER),
+        "full": etl.transform_history(TICKER, days=-1),
+        "chart": etl.transform_chart_history(TICKER),
+    }
+
+def test_backend_parity():
+    sqlite = load_backend("sqlite")
+    parquet = load_backend("parquet")
+
+    for name, expected in sqlite.items():
+        assert not expected.empty, name
+        pd.testing.assert_frame_equal(parquet[name], expected, check_dtype=False, check_freq=False)
+    print(f"✅ Parquet and SQLite backends return identical transforms ({len(sqlite['full'])} bars).")
+
+if __name__ == "__main__":
+    etl.provider = providers.FixtureProvider(path=None, years=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "prices.db")
+        price_store.PARQUET_DIR = os.path.join(tmp, "prices")
+        test_round_trip()
+        test_incremental_merge()
+        test_backend_parity()
+        etl.close_connections()
@@ -0,0 +1,192 @@
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+import etl
+import providers
+
+class FakeTicker:
+    """
+    Fake yf.Ticker with injectable latency and errors. Counts instances and calls.
+    ProviderClient wraps a Ticker factory, so unlike the other scripts this one
+    cannot use a FixtureProvider.
+    """
+    latency = 0.0
+    error = None # Exception raised by every call while set
+    created = 0
+    calls = 0
+    lock = threading.Lock()
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        with self.lock:
+            type(self).created += 1
+
+    def _respond(self, value):
+        with self.lock:
+            type(self).calls += 1
+        time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return value
+
+    def history(self, **kwargs):
+        dates = pd.date_range("2024-01-01", periods=5, freq="D", name="Date")
+        return self._respond(pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100}, index=dates))
+
+    def _statement(self):
+        dates = pd.to_datetime(["2024-12-31", "2023-12-31"])
+        return self._respond(pd.DataFrame({d: [1.0, 2.0] for d in dates}, index=["NetIncome", "TotalRevenue"]))
+
+    def get_balance_sheet(self):
+        return self._statement()
+
+    def get_income_stmt(self):
+        return self._statement()
+
+    def get_cashflow(self):
+        return self._statement()
+
+    @property
+    def news(self):
+        return self._respond([])
+
+def reset(**settings):
+    FakeTicker.created = FakeTicker.calls = 0
+    FakeTicker.latency = settings.get("latency", 0.0)
+    FakeTicker.error = settings.get("error")
+    etl.provider.client.reset()
+
+def test_client_reuse():
+    reset()
+    for extract in (etl.extract_history, etl.extract_balance_sheet, etl.extract_income_stmt, etl.extract_cashflow_stmt):
+        extract("AAA")
+    assert FakeTicker.created == 1 and FakeTicker.calls == 4, (FakeTicker.created, FakeTicker.calls)
+    print("✅ The four extracts share one Ticker per symbol.")
+
+class SlowClient(providers.ProviderClient):
+    """
+    ProviderClient that takes a while to build, widening the first-use race.
+    """
+    def __init__(self, *args, **kwargs):
+        time.sleep(0.05)
+        super().__init__(*args, **kwargs)
+
+def test_single_client():
+    provider = providers.YFinanceProvider(FakeTicker, rate=None)
+    barrier = threading.Barrier(16)
+    clients = []
+    def first_use():
+        barrier.wait()
+        clients.append(provider.client)
+    threads = [threading.Thread(target=first_use) for _ in range(16)]
+    client_class, providers.ProviderClient = providers.ProviderClient, SlowClient
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        providers.ProviderClient = client_class
+    assert len({id(client) for client in clients}) == 1, clients
+    print("✅ Concurrent first requests share one client, rate limit and breaker.")
+
+def test_incomplete_provider():
+    class NoNews(providers.MarketDataProvider):
+        def history(self, ticker, start=None): ...
+        def balance_sheet(self, ticker): ...
+        def income_stmt(self, ticker): ...
+        def cashflow(self, ticker): ...
+    try:
+        NoNews()
+        raise AssertionError("provider without news() was created")
+    except TypeError as e:
+        assert "news" in str(e), e
+    print("✅ A provider missing a method fails when it is created.")
+
+def test_rate_limit():
+    reset()
+    client = providers.ProviderClient(FakeTicker, rate=20, burst=5)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client.call, args=(f"T{i}", lambda stock: stock.history())) for i in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = client.stats()
+    # 5 requests from the burst, the remaining 20 at 20/s
+    assert elapsed >= 0.95, elapsed
+    assert stats["requests"] == 25 and stats["delayed"] == 20, stats
+    print(f"✅ 25 requests at 20/s (burst 5) took {elapsed:.2f}s: {stats}")
+
+def test_circuit_breaker():
+    reset(error=ConnectionError("connection reset"))
+    client = providers.ProviderClient(FakeTicker, rate=None, failure_threshold=3, reset_timeout=0.2)
+
+    for _ in range(3):
+        try:
+            client.call("AAA", lambda stock: stock.history())
+        except providers.CircuitOpenError:
+            raise
+        except providers.ProviderError:
+            pass
+    assert client.stats()["circuit"] == "open"
+
+    calls = FakeTicker.calls
+    try:
+        client.call("AAA", lambda stock: stock.history())
+        raise AssertionError("call went through an open circuit")
+    except providers.CircuitOpenError:
+        pass
+    assert FakeTicker.calls == calls # Rejected without touching the provider
+    print("✅ Circuit opens after repeated failures and rejects requests.")
+
+    time.sleep(0.25)
+    FakeTicker.error = None
+    assert client.stats()["circuit"] == "half-open"
+    client.call("AAA", lambda stock: stock.history())
+    stats = client.stats()
+    assert stats["circuit"] == "closed" and stats["failures"] == 3 and stats["rejected"] == 1, stats
+    print(f"✅ Trial call after the reset timeout closes the circuit: {stats}")
+
+def test_failures_surface():
+    reset(error=yf.exceptions.YFRateLimitError())
+    report = etl.load_universe(["AAA"], max_workers=1)
+
+    stats = etl.provider.stats()
+    assert report["AAA"]["status"] == "failed" and report["AAA"]["errors"], report
+    assert stats["throttled"] > 0, stats
+    print(f"✅ Throttling is reported instead of silently storing nothing: {stats}")
+
+def test_yfinance_errors_raise():
+    yf.config.debug.hide_exceptions = True # yfinance's default
+    proxy, yf.config.network.proxy = yf.config.network.proxy, "http://127.0.0.1:9" # Nothing listens here
+    try:
+        provider = providers.YFinanceProvider(rate=None)
+        try:
+            provider.history("MSFT")
+            raise AssertionError("failed request returned data")
+        except providers.ProviderError:
+            pass
+    finally:
+        yf.config.network.proxy = proxy
+
+    assert not yf.config.debug.hide_exceptions and provider.stats()["failures"] == 1, provider.stats()
+    print("✅ Real yfinance failures raise and are counted by the circuit breaker.")
+
+if __name__ == "__main__":
+    etl.provider = providers.YFinanceProvider(FakeTicker, rate=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "providers.db")
+        test_client_reuse()
+        test_single_client()
+        test_incomplete_provider()
+        test_rate_limit()
+        test_circuit_breaker()
+        test_failures_surface()
+        test_yfinance_errors_raise()
+        etl.close_connections()
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import etl
+import providers
+import scheduler
+
+class FlakyProvider(providers.FixtureProvider):
+    """
+    Fixture provider whose history fails for the first `failures` calls
+    and whose news fails while `news_down` is set.
+    """
+    failures = 0
+    calls = 0
+    news_down = False
+
+    def history(self, ticker, start=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise providers.ProviderError(f"Request for {ticker} failed: simulated throttling")
+        return super().history(ticker, start)
+
+    def news(self, ticker):
+        if self.news_down:
+            raise providers.ProviderError("news endpoint down")
+        return super().news(ticker)
+
+def jobs() -> list[tuple]:
+    return etl.get_connection().execute(
+        "SELECT ticker, kind, status, attempts, duration FROM scheduler_jobs ORDER BY ticker, kind, id"
+    ).fetchall()
+
+def test_cadence():
+    etl.provider.failures = etl.provider.calls = 0
+    scheduler.run(["AAA", "BBB"], once=True)
+
+    rows = jobs()
+    assert [(t, k, s) for t, k, s, _, _ in rows] == [
+        ("AAA", "news", "done"), ("AAA", "prices", "done"), ("AAA", "statements", "done"),
+        ("BBB", "news", "done"), ("BBB", "prices", "done"), ("BBB", "statements", "done"),
+    ], rows
+    assert all(duration is not None and duration >= 0 for *_, duration in rows)
+    assert len(etl.transform_history("AAA", days=-1)) == etl.provider.years * 261
+    print("✅ Every ticker refreshed once, with durations recorded.")
+
+    # Nothing is due again until the interval passes
+    assert scheduler.schedule_due(["AAA", "BBB"]) == 0
+    scheduler.JOB_INTERVALS["prices"] = 0
+    assert scheduler.schedule_due(["AAA", "BBB"]) == 2
+    assert scheduler.schedule_due(["AAA", "BBB"]) == 0 # Open jobs are not queued twice
+    scheduler.run(["AAA", "BBB"], once=True)
+    print("✅ Prices are re-queued on their own cadence, news and statements are not.")
+
+    # Unchanged statements write nothing new, which is still a successful refresh
+    scheduler.enqueue("AAA", "statements")
+    job = scheduler.claim_job()
+    assert scheduler.run_job(job)
+    status = {s["kind"]: s for s in scheduler.job_status("AAA")}["statements"]
+    assert status["status"] == "done" and status["last_error"] is None, status
+    print("✅ A refresh with nothing new to write counts as done.")
+
+def test_retry_backoff():
+    etl.provider.failures, etl.provider.calls = 2, 0
+    scheduler.JOB_INTERVALS["prices"] = 3600
+    scheduler.enqueue("CCC", "prices")
+
+    job = scheduler.claim_job()
+    assert not scheduler.run_job(job)
+    pending = etl.get_connection().execute(
+        "SELECT due_at - ?, attempts FROM scheduler_jobs WHERE id = ?", (time.time(), job["id"])
+    ).fetchone()
+    assert pending[1] == 1 and pending[0] > 0, pending
+    assert scheduler.claim_job() is None # Not due until the backoff has passed
+
+    deadline = time.time() + 5
+    while scheduler.job_status("CCC")[0]["status"] != "done" and time.time() < deadline:
+        job = scheduler.claim_job()
+        if job is not None:
+            scheduler.run_job(job)
+        time.sleep(0.01)
+
+    status = scheduler.job_status("CCC")[0]
+    assert status["status"] == "done" and status["attempts"] == 3, status
+    print(f"✅ Failed job succeeded on attempt {status['attempts']} after exponential backoff.")
+
+def test_news_outage_keeps_prices():
+    etl.provider.failures = etl.provider.calls = 0
+    etl.provider.news_down = True
+    try:
+        scheduler.run(["FFF"], once=True)
+    finally:
+        etl.provider.news_down = False
+
+    status = {s["kind"]: s for s in scheduler.job_status("FFF")}
+    assert status["prices"]["status"] == "done", status
+    assert status["news"]["status"] == "pending" and "news endpoint down" in status["news"]["last_error"], status
+    assert len(etl.transform_history("FFF", days=-1)) == etl.provider.years * 261
+
+    # Once the endpoint is back, the retry picks up the news
+    time.sleep(scheduler.RETRY_BACKOFF * 2)
+    scheduler.run(["FFF"], once=True)
+    assert scheduler.job_status("FFF")[0]["status"] == "done"
+    print("✅ A news outage is retried on its own while prices still land.")
+
+def test_enqueue_is_idempotent():
+    scheduler.enqueue("DDD", "statements", due_at=time.time() + 60)
+    scheduler.enqueue("DDD", "statements")
+    open_jobs = [row for row in jobs() if row[0] == "DDD"]
+    assert len(open_jobs) == 1, open_jobs
+    assert scheduler.claim_job()["ticker"] == "DDD" # Moved forward to now
+    print("✅ Repeated enqueues share one job.")
+
+def test_recovery_respects_leases():
+    scheduler.enqueue("EEE", "prices")
+    job = scheduler.claim_job()
+    assert job["ticker"] == "EEE"
+
+    # A second scheduler starting up leaves the live claim alone
+    scheduler.run([], once=True)
+    assert scheduler.job_status("EEE")[0]["status"] == "running"
+
+    # Claims older than the lease belong to a dead scheduler and are re-queued
+    assert scheduler.recover_jobs(lease=0) >= 1
+    assert scheduler.job_status("EEE")[0]["status"] == "pending"
+    print("✅ Only expired claims are recovered.")
+
+if __name__ == "__main__":
+    etl.provider = FlakyProvider(path=None, years=1)
+    scheduler.RETRY_BACKOFF = 0.05
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "scheduler.db")
+        test_cadence()
+        test_retry_backoff()
+        test_news_outage_keeps_prices()
+        test_enqueue_is_idempotent()
+        test_recovery_respects_leases()
+        etl.close_connections()
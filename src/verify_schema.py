@@ -0,0 +1,54 @@
+import os
+import tempfile
+import etl
+import schema
+
+def capture_queries(fn) -> list[str]:
+    """
+    Runs fn and returns every SELECT it sent to the shared connection,
+    with bound parameters expanded.
+    """
+    statements = []
+    conn = etl.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+def query_plan(sql: str) -> list[str]:
+    return [row[3] for row in etl.get_connection().execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+def test_schema_version():
+    version = schema.get_version(etl.get_connection())
+    assert version == schema.SCHEMA_VERSION, version
+    # Re-running migrations on an up-to-date database is a no-op
+    assert schema.migrate(etl.get_connection()) == schema.SCHEMA_VERSION
+    print(f"✅ Schema at version {version}.")
+
+def test_hot_queries_use_indexes():
+    hot_paths = {
+        "transform_history (full)": lambda: etl.transform_history("UBSG.SW", days=-1),
+        "transform_history (window)": lambda: etl.transform_history("UBSG.SW", days=90),
+        "transform_financial_statement": lambda: etl.transform_financial_statement("UBSG.SW", "income_stmt"),
+        "transform_peers": lambda: etl.transform_peers("UBSG.SW"),
+        "transform_news": lambda: etl.transform_news("UBSG.SW"),
+        "latest_history_date": lambda: etl.latest_history_date("UBSG.SW"),
+    }
+
+    for name, fn in hot_paths.items():
+        queries = capture_queries(fn)
+        assert queries, f"{name} issued no SELECT"
+        for sql in queries:
+            plan = query_plan(sql)
+            assert not any(step.startswith("SCAN") for step in plan), f"{name} scans: {plan}"
+            assert any("INDEX" in step for step in plan), f"{name} uses no index: {plan}"
+            print(f"✅ {name}: {' | '.join(plan)}")
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "schema.db")
+        test_schema_version()
+        test_hot_queries_use_indexes()
+        etl.close_connections()
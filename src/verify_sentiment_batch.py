@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ai_analysis
+import etl
+
+LATENCY = 0.3 # Simulated inference time per request (seconds)
+TICKERS = [f"T{i:02d}" for i in range(16)]
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for Ollama's streaming /api/generate endpoint.
+    """
+    requests = 0
+    fail_first = set() # Prompts containing these tickers fail once with HTTP 500
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests += 1
+        time.sleep(LATENCY)
+
+        for ticker in list(self.fail_first):
+            if ticker in body.get("prompt", ""):
+                self.fail_first.discard(ticker)
+                self.send_response(500)
+                self.end_headers()
+                return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for token in ["Score: 7", "\nSummary: ", "Mock analysis."]:
+            self.wfile.write((json.dumps({"model": body["model"], "response": token, "done": False}) + "\n").encode())
+        self.wfile.write((json.dumps({"model": body["model"], "response": "", "done": True}) + "\n").encode())
+
+    def log_message(self, *args):
+        pass
+
+def mock_news(ticker: str) -> list[dict]:
+    # Unique headlines per run so the sentiment cache does not short-circuit the benchmark
+    return [{"title": f"{ticker} headline {i} ({time.time_ns()})"} for i in range(5)]
+
+def run(base_url: str, max_in_flight: int) -> float:
+    start = time.perf_counter()
+    results = ai_analysis.score_universe(TICKERS, max_in_flight=max_in_flight, timeout=10,
+                                         base_url=base_url, news_fn=mock_news)
+    elapsed = time.perf_counter() - start
+    assert all(r["score"] == 7 and r["error"] is None for r in results), results
+    print(f"max_in_flight={max_in_flight}: {len(TICKERS) / elapsed:.2f} tickers/s")
+    return elapsed
+
+def test_single_writer(base_url: str):
+    threads = set()
+    def recording_news(ticker: str) -> list[dict]:
+        threads.add(threading.current_thread())
+        return mock_news(ticker)
+
+    # A broken cache (here: its table is gone) degrades to misses instead of aborting the batch
+    conn = etl.get_connection()
+    conn.execute("ALTER TABLE sentiment_cache RENAME TO sentiment_cache_moved")
+    try:
+        results = ai_analysis.score_universe(TICKERS, max_in_flight=8, timeout=10, base_url=base_url, news_fn=recording_news)
+    finally:
+        conn.execute("ALTER TABLE sentiment_cache_moved RENAME TO sentiment_cache")
+    assert all(r["score"] == 7 and r["error"] is None and r["attempts"] == 1 for r in results), results
+    assert threads == {threading.main_thread()}, threads
+    print("✅ News and cache access stay on the calling thread; cache errors do not fail the batch.")
+
+def test_batch_scoring():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    ai_analysis.RETRY_BACKOFF = 0.05
+
+    try:
+        sequential = run(base_url, max_in_flight=1)
+        concurrent = run(base_url, max_in_flight=8)
+        assert concurrent < sequential
+        print("✅ Bounded concurrency increases throughput.")
+
+        MockOllamaHandler.fail_first = {"T03"}
+        run(base_url, max_in_flight=8)
+        attempts = etl.get_connection().execute(
+            "SELECT attempts FROM stock_sentiment WHERE ticker = 'T03' ORDER BY scored_at DESC LIMIT 1"
+        ).fetchone()[0]
+        assert attempts == 2, attempts
+        print("✅ Failed requests are retried.")
+
+        stored = etl.get_connection().execute("SELECT COUNT(DISTINCT ticker) FROM stock_sentiment").fetchone()[0]
+        assert stored == len(TICKERS), stored
+        # Same clock as etl_runs and stock_news: naive local time
+        scored_at = datetime.fromisoformat(etl.get_connection().execute(
+            "SELECT MAX(scored_at) FROM stock_sentiment"
+        ).fetchone()[0])
+        assert scored_at.tzinfo is None and abs((datetime.now() - scored_at).total_seconds()) < 60, scored_at
+        print("✅ Results stored in stock_sentiment.")
+
+        test_single_writer(base_url)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "sentiment.db")
+        test_batch_scoring()
+        etl.close_connections()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import time
+import ai_analysis
+import etl
+
+TOKEN_DELAY = 0.05 # Seconds between streamed tokens
+RESPONSE = ["Score", ":", " 8", "\n", "Summary", ":"] + [f" word{i}" for i in range(40)] + ["."]
+
+class FakeStreamingChain:
+    """
+    Stands in for the prompt | model chain, streaming RESPONSE (or `response`) token by token.
+    """
+    def __init__(self, response: list[str] = RESPONSE, delay: float = TOKEN_DELAY):
+        self.response = response
+        self.delay = delay
+
+    def stream(self, inputs):
+        for token in self.response:
+            time.sleep(self.delay)
+            yield token
+
+    def invoke(self, inputs):
+        return "".join(self.stream(inputs))
+
+def test_perceived_latency():
+    ai_analysis._get_chain = lambda *args, **kwargs: FakeStreamingChain()
+    news = [{"title": f"Headline {i}"} for i in range(5)]
+
+    # Blocking call: nothing is shown until the full completion is parsed
+    start = time.perf_counter()
+    ai_analysis.analyze_sentiment(news, use_cache=False)
+    blocking = time.perf_counter() - start
+
+    parser = ai_analysis.SentimentStreamParser()
+    first_token = time_to_score = None
+    start = time.perf_counter()
+    for _ in ai_analysis.stream_sentiment(news, parser, use_cache=False):
+        now = time.perf_counter() - start
+        first_token = first_token if first_token is not None else now
+        if parser.score is not None and time_to_score is None:
+            time_to_score = now
+    total = time.perf_counter() - start
+
+    print(f"Blocking: {blocking:.2f}s | streaming: first token {first_token:.2f}s, score {time_to_score:.2f}s, total {total:.2f}s")
+    assert parser.result() == (8, " ".join(f"word{i}" for i in range(40)) + ".")
+    assert first_token < blocking / 10
+    assert time_to_score < blocking / 5
+    print("✅ Score is available long before the completion finishes.")
+
+def test_parser_waits_for_complete_line():
+    parser = ai_analysis.SentimentStreamParser()
+    assert not parser.feed("Score: 1")
+    assert not parser.feed("0/10")
+    assert parser.feed("\nSumm")
+    assert parser.score == 10
+    print("✅ Parser only reads the score once its line is complete.")
+
+def test_unparseable_output_not_cached():
+    ai_analysis._get_chain = lambda *args, **kwargs: FakeStreamingChain(["I cannot", " rate these headlines."], delay=0)
+    news = [{"title": f"Unparseable {i}"} for i in range(5)]
+
+    assert ai_analysis.analyze_sentiment(news) == (5, "Could not parse analysis.")
+    parser = ai_analysis.SentimentStreamParser()
+    list(ai_analysis.stream_sentiment(news, parser))
+    assert not parser.parsed and parser.result() == (5, "Could not parse analysis.")
+    results = ai_analysis.score_universe(["UNP"], news_fn=lambda ticker: news)
+    assert results[0]["score"] == 5 and not results[0]["parsed"], results
+    assert ai_analysis.cache_stats()["entries"] == 0
+
+    # The next, well-formed generation is scored and cached as usual
+    ai_analysis._get_chain = lambda *args, **kwargs: FakeStreamingChain(delay=0)
+    assert ai_analysis.analyze_sentiment(news)[0] == 8
+    assert ai_analysis.cache_stats()["entries"] == 1
+    print("✅ Unparseable model output is not cached.")
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "stream.db")
+        test_parser_waits_for_complete_line()
+        test_perceived_latency()
+        test_unparseable_output_not_cached()
+        etl.close_connections()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import etl
+import providers
+
+TICKER_A, TICKER_B = "AAA", "BBB"
+TRANSFORMS = {
+    "transform_history": lambda t: etl.transform_history(t, days=-1),
+    "transform_financial_statement": lambda t: etl.transform_financial_statement(t, "income_stmt"),
+    "transform_news": lambda t: etl.transform_news(t),
+}
+
+def call_all(ticker: str) -> dict:
+    """
+    Runs every transform for a ticker and returns the cache hits and misses it caused.
+    """
+    before = etl.cache_stats()
+    for fn in TRANSFORMS.values():
+        fn(ticker)
+    after = etl.cache_stats()
+    return {"hits": after["hits"] - before["hits"], "misses": after["misses"] - before["misses"]}
+
+def test_repeat_calls_hit():
+    etl.clear_cache()
+    assert call_all(TICKER_A) == {"hits": 0, "misses": len(TRANSFORMS)}
+    assert call_all(TICKER_A) == {"hits": len(TRANSFORMS), "misses": 0}
+    assert etl.cache_stats()["entries"] == len(TRANSFORMS)
+
+    # Callers get copies, so modifying a result does not corrupt the cache
+    history = etl.transform_history(TICKER_A, days=-1)
+    history["close"] = 0.0
+    assert (etl.transform_history(TICKER_A, days=-1)["close"] > 0).all()
+    print(f"✅ Repeated transforms are served from the cache: {etl.cache_stats()}")
+
+def test_write_invalidates_only_its_ticker():
+    call_all(TICKER_A)
+    call_all(TICKER_B)
+
+    # Re-fetching an unchanged bar writes nothing, so nothing is invalidated
+    latest = etl.provider.history(TICKER_A).tail(1).reset_index()
+    assert etl.load_history(TICKER_A, latest) == 0
+    assert call_all(TICKER_A) == {"hits": len(TRANSFORMS), "misses": 0}
+
+    version_b = etl.data_version(TICKER_B)
+    latest["Close"] *= 1.01
+    assert etl.load_history(TICKER_A, latest) == 1
+    assert etl.data_version(TICKER_B) == version_b
+
+    assert call_all(TICKER_A) == {"hits": 0, "misses": len(TRANSFORMS)}
+    assert call_all(TICKER_B) == {"hits": len(TRANSFORMS), "misses": 0}
+    print("✅ A write for one ticker invalidates exactly that ticker's cached transforms.")
+
+def test_new_data_is_visible():
+    rows = len(etl.transform_news(TICKER_A, limit=100))
+    etl.load_news(TICKER_A, [{"id": "extra", "title": "Extra headline", "publisher": None, "link": None,
+                              "published_at": "2000-01-01T00:00:00+00:00"}])
+    assert len(etl.transform_news(TICKER_A, limit=100)) == rows + 1
+    print("✅ Results reflect new data immediately after a write.")
+
+if __name__ == "__main__":
+    etl.provider = providers.FixtureProvider(path=None, years=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        etl.DB_NAME = os.path.join(tmp, "cache.db")
+        etl.load_universe([TICKER_A, TICKER_B])
+        test_repeat_calls_hit()
+        test_write_invalidates_only_its_ticker()
+        test_new_data_is_visible()
+        etl.close_connections()